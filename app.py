@@ -1,20 +1,60 @@
 import os
 import json
-import time
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from modules.idea_generator import IdeaGenerator
-from modules.voice_generator import VoiceGenerator
-from modules.video_selector import VideoSelector
-from modules.video_editor import VideoEditor
+import threading
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, stream_with_context
+from utils.helpers import load_json
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'assets/output'
 
-# Initialize modules
-idea_gen = IdeaGenerator()
-voice_gen = VoiceGenerator()
-video_sel = VideoSelector()
-video_ed = VideoEditor()
+# Modules are built on first use so the server starts without loading the
+# OpenAI client or the media stack
+_modules = {}
+_modules_lock = threading.RLock()
+
+def _get(name, factory):
+    """Return the shared instance `name`, creating it with factory() once"""
+    instance = _modules.get(name)
+    if instance is None:
+        with _modules_lock:
+            instance = _modules.get(name)
+            if instance is None:
+                instance = _modules[name] = factory()
+    return instance
+
+def get_idea_gen():
+    from modules.idea_generator import IdeaGenerator
+    return _get('idea_gen', IdeaGenerator)
+
+def get_video_pipeline():
+    def build():
+        from modules.voice_generator import VoiceGenerator
+        from modules.video_selector import VideoSelector
+        from modules.video_editor import VideoEditor
+        from modules.video_pipeline import VideoPipeline
+        # Drafts and promotes render straight through; the captionless base
+        # is only built by the first recaption and reused by later ones
+        return VideoPipeline(VoiceGenerator(), VideoSelector(), VideoEditor())
+    return _get('video_pipeline', build)
+
+def _record_script(script):
+    """Remember a script a web job produced, so generated ideas avoid repeating it"""
+    script_index = get_idea_gen().script_index
+    if script_index:
+        script_index.record(script)
+
+def get_job_queue():
+    """Background render jobs"""
+    def build():
+        from modules.job_queue import JobQueue
+        web_config = load_json('config.json').get('web_settings', {})
+        return JobQueue(
+            get_video_pipeline(),
+            max_workers=web_config.get('render_workers', 2),
+            job_ttl=web_config.get('job_ttl', 3600),
+            on_produced=_record_script
+        )
+    return _get('job_queue', build)
 
 @app.route('/')
 def index():
@@ -27,7 +67,7 @@ def generate_idea():
         audience = request.form.get('audience')
         trend = request.form.get('trend')
         
-        idea = idea_gen.generate_video_idea(
+        idea = get_idea_gen().generate_video_idea(
             category=category if category else None,
             audience=audience if audience else None,
             trend=trend if trend else None
@@ -37,32 +77,98 @@ def generate_idea():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+def _job_urls(job_id):
+    return {
+        'job_id': job_id,
+        'status_url': f"/jobs/{job_id}",
+        'events_url': f"/jobs/{job_id}/events"
+    }
+
+def _job_response(job):
+    """Public view of a job, with a URL for the finished video"""
+    job = dict(job)
+    video_path = job.pop('video_path')
+    job['video_url'] = f"/videos/{os.path.basename(video_path)}" if video_path else None
+    return job
+
 @app.route('/generate_video', methods=['POST'])
 def generate_video():
     try:
         data = request.get_json()
         script = data.get('script')
+        if not script:
+            return jsonify({'success': False, 'error': 'Missing script'})
         
-        # Generate voiceover
-        audio_file = voice_gen.generate_from_script(script)
-        if not audio_file:
-            return jsonify({'success': False, 'error': 'Failed to generate voiceover'})
-        
-        # Select video clips
-        video_files = video_sel.select_videos_for_script(script)
-        if not video_files:
-            return jsonify({'success': False, 'error': 'Failed to select video clips'})
+        # Render a quick preview by default; /jobs/<id>/promote makes the final cut
+        config = load_json('config.json')
+        profile = data.get('profile') or config.get('web_settings', {}).get('preview_profile', 'final')
+        if profile != 'final' and profile not in config.get('render_profiles', {}):
+            return jsonify({'success': False, 'error': f"Unknown render profile: {profile}"})
         
-        # Create final video
-        timestamp = int(time.time())
-        output_name = f"tiktok_{timestamp}.mp4"
-        output_video = video_ed.create_video(script, video_files, audio_file, output_name=output_name)
-        
-        if output_video:
-            video_url = f"/videos/{os.path.basename(output_video)}"
-            return jsonify({'success': True, 'video_url': video_url})
-        else:
-            return jsonify({'success': False, 'error': 'Failed to create video'})
+        # Render in the background; the client follows progress via the job endpoints
+        job_id, deduplicated = get_job_queue().submit(script, profile=profile)
+        return jsonify(dict(_job_urls(job_id), success=True, deduplicated=deduplicated, profile=profile))
             
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify({'success': True, 'job': _job_response(job)})
+
+@app.route('/jobs/<job_id>/promote', methods=['POST'])
+def promote_job(job_id):
+    """Re-render a finished preview at full quality, reusing its audio, clips and cut list"""
+    submitted = get_job_queue().promote(job_id)
+    if not submitted:
+        return jsonify({'success': False, 'error': 'Job is unknown or not finished'}), 404
+    
+    promoted_id, deduplicated = submitted
+    return jsonify(dict(_job_urls(promoted_id), success=True, deduplicated=deduplicated, profile='final'))
+
+@app.route('/jobs/<job_id>/recaption', methods=['POST'])
+def recaption_job(job_id):
+    """Re-render a finished video with edited caption text, reusing its footage and voiceover"""
+    data = request.get_json(silent=True) or {}
+    script = {key: data[key] for key in ('hook', 'body', 'cta') if data.get(key)}
+    if not script:
+        return jsonify({'success': False, 'error': 'Missing caption text'}), 400
+    
+    submitted = get_job_queue().recaption(job_id, script)
+    if not submitted:
+        return jsonify({'success': False, 'error': 'Job is unknown or not finished'}), 404
+    
+    recaptioned_id, deduplicated = submitted
+    job = get_job_queue().get(recaptioned_id)
+    return jsonify(dict(_job_urls(recaptioned_id), success=True, deduplicated=deduplicated, profile=job['profile']))
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events stream of job progress"""
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    
+    def stream(job):
+        while job:
+            yield f"data: {json.dumps(_job_response(job))}\n\n"
+            if job['status'] in ('done', 'failed'):
+                break
+            job = get_job_queue().wait_for_update(job_id, job['version'])
+    
+    return Response(stream_with_context(stream(job)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    from utils import metrics
+    body, content_type = metrics.latest()
+    return Response(body, mimetype=content_type.split(';')[0], headers={'Content-Type': content_type})
+
+@app.route('/videos/<path:filename>')
+def serve_video(filename):
+    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
@@ -2,116 +2,302 @@ import os
 import json
 import time
 import argparse
-import concurrent.futures
-from modules.idea_generator import IdeaGenerator
-from modules.voice_generator import VoiceGenerator
-from modules.video_selector import VideoSelector
-from modules.video_editor import VideoEditor
 from utils.logger import setup_logger
+from utils.pipeline import Stage, StagedPipeline
+from utils.job_store import JobStore
+from utils.http_client import get_client
+from utils.helpers import load_json
+from utils import metrics
 
 # Set up logger
 logger = setup_logger('batch_processor')
 
 class BatchProcessor:
-    def __init__(self, max_workers=4):
+    def __init__(self, max_workers=4, idea_concurrency=None, voice_workers=None, clip_workers=None,
+                 render_workers=None, queue_size=None, idea_batch_size=None):
         self.max_workers = max_workers
+        self.idea_concurrency = idea_concurrency
+        self.idea_batch_size = idea_batch_size
+        # failed_ids/duplicate_ids of the ideas generated by this processor
+        self.idea_report = {}
+        
+        # Per-stage pool sizes fall back to max_workers
+        self.voice_workers = voice_workers or max_workers
+        self.clip_workers = clip_workers or max_workers
+        self.render_workers = render_workers or max_workers
+        self.queue_size = queue_size or max_workers
+        
+        # Imported here so `--help` and argument errors return without loading the providers
+        from modules.idea_generator import IdeaGenerator
+        from modules.voice_generator import VoiceGenerator
+        from modules.video_selector import VideoSelector
+        from modules.video_editor import VideoEditor
+        from modules.render_pool import RenderPool
+        from modules.video_pipeline import VideoPipeline
+        
         self.idea_gen = IdeaGenerator()
         self.voice_gen = VoiceGenerator()
         self.video_sel = VideoSelector()
         self.video_ed = VideoEditor()
-        logger.info(f"BatchProcessor initialized with {max_workers} workers")
+        self.job_store = JobStore()
+        
+        # Optional process-pool render backend
+        self.render_pool = None
+        if self.video_ed.config.get('render_backend', 'thread') == 'process':
+            self.render_pool = RenderPool(processes=render_workers)
+            self.render_workers = self.render_pool.processes
+        
+        self.video_pipeline = VideoPipeline(
+            self.voice_gen,
+            self.video_sel,
+            self.video_ed,
+            render=self.render_pool.render if self.render_pool else None
+        )
+        logger.info(
+            f"BatchProcessor initialized with {self.voice_workers} voice, {self.clip_workers} clip "
+            f"and {self.render_workers} render workers"
+        )
     
-    def generate_ideas(self, count, output_file=None):
+    def generate_ideas(self, count, output_file=None, concurrency=None):
         """Generate multiple video ideas"""
         logger.info(f"Generating {count} video ideas")
-        ideas = self.idea_gen.generate_multiple_ideas(count=count, output_file=output_file)
+        ideas = self.idea_gen.generate_multiple_ideas(
+            count=count,
+            output_file=output_file,
+            concurrency=concurrency or self.idea_concurrency,
+            batch_size=self.idea_batch_size,
+            report=self.idea_report
+        )
         return ideas
     
+    def _make_job(self, idea, batch_id=None, stored=None):
+        """Build a pipeline job, restoring artifacts checkpointed by an earlier run"""
+        job = {'idea_id': idea.get('id', 'unknown'), 'idea': idea, 'batch_id': batch_id}
+        if stored:
+            for name in ('audio_file', 'video_files', 'video_path'):
+                if stored.get(name):
+                    job[name] = stored[name]
+            # A finished video needs none of its inputs again, even if they were evicted
+            job['rendered'] = stored.get('stage') == 'rendered' and bool(job.get('video_path')) and \
+                os.path.exists(job['video_path'])
+        return job
+    
+    def _checkpoint(self, job, stage, **artifacts):
+        if job.get('batch_id'):
+            self.job_store.checkpoint(job['batch_id'], job['idea_id'], stage, **artifacts)
+    
+    def _fail(self, job, error):
+        logger.error(error)
+        if job.get('batch_id'):
+            self.job_store.record_error(job['batch_id'], job['idea_id'], error)
+        return None
+    
+    def _voice_stage(self, job):
+        """Pipeline stage: generate the voiceover"""
+        idea = job['idea']
+        if job.get('rendered'):
+            return job
+        if job.get('audio_file') and os.path.exists(job['audio_file']):
+            logger.info(f"Reusing voiceover for idea {job['idea_id']}: {job['audio_file']}")
+            return job
+        
+        logger.info(f"Processing idea {job['idea_id']}: {idea['title']}")
+        
+        job['audio_file'] = self.voice_gen.generate_from_script(idea['script'])
+        if not job['audio_file']:
+            return self._fail(job, f"Failed to generate voiceover for idea {job['idea_id']}")
+        self._checkpoint(job, 'audio', audio_file=job['audio_file'])
+        return job
+    
+    def _clip_stage(self, job):
+        """Pipeline stage: select and download video clips"""
+        if job.get('rendered'):
+            return job
+        if job.get('video_files') and all(os.path.exists(path) for path in job['video_files']):
+            logger.info(f"Reusing {len(job['video_files'])} clips for idea {job['idea_id']}")
+            return job
+        
+        job['video_files'] = self.video_sel.select_videos_for_script(job['idea']['script'])
+        if not job['video_files']:
+            return self._fail(job, f"Failed to select video clips for idea {job['idea_id']}")
+        # Released by the render stage
+        job['pinned_clips'] = job['video_files']
+        self._checkpoint(job, 'clips', video_files=job['video_files'])
+        return job
+    
+    def _render_stage(self, job):
+        """Pipeline stage: render the final video, then unpin its clips"""
+        try:
+            return self._render(job)
+        finally:
+            self.video_sel.release_clips(job.pop('pinned_clips', None))
+    
+    def _render(self, job):
+        if job.get('video_path') and os.path.exists(job['video_path']):
+            logger.info(f"Video for idea {job['idea_id']} already rendered: {job['video_path']}")
+            if not job.get('rendered'):
+                self._checkpoint(job, 'rendered', video_path=job['video_path'])
+            return job
+        
+        output_name = f"tiktok_{job['idea_id']}_{int(time.time())}.mp4"
+        render = self.render_pool.render if self.render_pool else self.video_ed.create_video
+        job['video_path'] = render(
+            job['idea']['script'],
+            job['video_files'],
+            job['audio_file'],
+            output_name=output_name
+        )
+        
+        if job['video_path']:
+            logger.info(f"Video for idea {job['idea_id']} created: {job['video_path']}")
+            self._checkpoint(job, 'rendered', video_path=job['video_path'])
+            self._record_script(job['idea'])
+            return job
+        else:
+            return self._fail(job, f"Failed to create video for idea {job['idea_id']}")
+    
+    def _record_script(self, idea):
+        """Remember a produced script so later batches can avoid repeating it"""
+        if self.idea_gen.script_index:
+            self.idea_gen.script_index.record(idea['script'], title=idea.get('title'))
+    
     def process_idea(self, idea):
         """Process a single idea into a video"""
         try:
             idea_id = idea.get('id', 'unknown')
             logger.info(f"Processing idea {idea_id}: {idea['title']}")
             
-            # Generate voiceover
-            audio_file = self.voice_gen.generate_from_script(idea['script'])
-            if not audio_file:
-                logger.error(f"Failed to generate voiceover for idea {idea_id}")
-                return None
-            
-            # Select video clips
-            video_files = self.video_sel.select_videos_for_script(idea['script'])
-            if not video_files:
-                logger.error(f"Failed to select video clips for idea {idea_id}")
-                return None
-            
-            # Create final video
-            output_name = f"tiktok_{idea_id}_{int(time.time())}.mp4"
-            output_video = self.video_ed.create_video(
+            result = self.video_pipeline.produce(
                 idea['script'],
-                video_files,
-                audio_file,
-                output_name=output_name
+                output_name=f"tiktok_{idea_id}_{int(time.time())}.mp4"
             )
-            
-            if output_video:
-                logger.info(f"Video for idea {idea_id} created: {output_video}")
-                return output_video
-            else:
-                logger.error(f"Failed to create video for idea {idea_id}")
+            if result['error']:
+                logger.error(f"{result['error']} for idea {idea_id}")
                 return None
+            
+            logger.info(f"Video for idea {idea_id} created: {result['video_path']}")
+            self._record_script(idea)
+            return result['video_path']
                 
         except Exception as e:
             logger.error(f"Error processing idea: {e}")
             return None
     
-    def process_batch(self, ideas):
-        """Process a batch of ideas in parallel"""
-        results = []
+    def process_batch(self, ideas, batch_id=None):
+        """Process a batch of ideas through the voice -> clips -> render pipeline"""
+        stored = {}
+        if batch_id:
+            stored = {job['idea_id']: job for job in self.job_store.get_jobs(batch_id)}
+        # Near-duplicates flagged at generation would only spend render capacity on repeats
+        duplicates = [idea.get('id') for idea in ideas if idea.get('duplicate_of')]
+        if duplicates:
+            logger.info(f"Skipping {len(duplicates)} near-duplicate ideas: {duplicates}")
+        jobs = [
+            self._make_job(idea, batch_id, stored.get(str(idea.get('id'))))
+            for idea in ideas if not idea.get('duplicate_of')
+        ]
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_idea = {executor.submit(self.process_idea, idea): idea for idea in ideas}
-            
-            for future in concurrent.futures.as_completed(future_to_idea):
-                idea = future_to_idea[future]
-                try:
-                    result = future.result()
-                    if result:
-                        results.append({
-                            'idea_id': idea.get('id', 'unknown'),
-                            'title': idea['title'],
-                            'video_path': result
-                        })
-                except Exception as e:
-                    logger.error(f"Error processing idea {idea.get('id', 'unknown')}: {e}")
+        pipeline = StagedPipeline([
+            Stage('voice', self._voice_stage, workers=self.voice_workers),
+            Stage('clips', self._clip_stage, workers=self.clip_workers),
+            Stage('render', self._render_stage, workers=self.render_workers)
+        ], queue_size=self.queue_size)
+        
+        results = []
+        for job in pipeline.run(jobs):
+            results.append({
+                'idea_id': job['idea_id'],
+                'title': job['idea']['title'],
+                'video_path': job['video_path']
+            })
         
         return results
     
-    def run(self, count=10, ideas_file=None):
-        """Run the batch processor"""
+    def close(self):
+        """Release the render worker processes"""
+        if self.render_pool:
+            self.render_pool.shutdown()
+    
+    def get_stats(self):
+        """Collect cache and provider statistics for the batch report"""
+        stats = {
+            'clip_cache': self.video_sel.cache.get_stats(),
+            'failed_idea_ids': self.idea_report.get('failed_ids', []),
+            'duplicate_idea_ids': self.idea_report.get('duplicate_ids', []),
+            'http': get_client().get_stats(),
+            'downloads': self.video_sel.downloader.get_stats(),
+            'renditions': self.video_sel.rendition_picker.get_stats()
+        }
+        if self.idea_gen.cache:
+            stats['idea_cache'] = self.idea_gen.cache.get_stats()
+        if self.idea_gen.script_index:
+            stats['script_index'] = self.idea_gen.script_index.get_stats()
+        if self.video_sel.library:
+            stats['clip_library'] = self.video_sel.library.get_stats()
+        return stats
+    
+    def run(self, count=10, ideas_file=None, resume=None):
+        """Run the batch processor, or resume an earlier batch by id"""
         start_time = time.time()
-        logger.info(f"Starting batch processing of {count} videos")
         
-        # Generate or load ideas
-        if ideas_file and os.path.exists(ideas_file):
-            logger.info(f"Loading ideas from {ideas_file}")
-            with open(ideas_file, 'r') as f:
-                ideas = json.load(f)
+        if resume:
+            batch = self.job_store.get_batch(resume)
+            if not batch:
+                logger.error(f"Unknown batch id: {resume}")
+                return []
+            
+            batch_id = resume
+            jobs = self.job_store.get_jobs(batch_id)
+            ideas = sorted((job['idea'] for job in jobs), key=lambda idea: idea['id'])
+            count = len(ideas)
+            done = sum(1 for job in jobs if job['stage'] == 'rendered')
+            logger.info(f"Resuming batch {batch_id}: {done} of {count} videos already rendered")
         else:
-            ideas_file = f"video_ideas_{int(time.time())}.json"
-            ideas = self.generate_ideas(count, output_file=ideas_file)
+            logger.info(f"Starting batch processing of {count} videos")
+            
+            # Generate or load ideas
+            if ideas_file and os.path.exists(ideas_file):
+                logger.info(f"Loading ideas from {ideas_file}")
+                with open(ideas_file, 'r') as f:
+                    ideas = json.load(f)
+            else:
+                ideas_file = f"video_ideas_{int(time.time())}.json"
+                ideas = self.generate_ideas(count, output_file=ideas_file)
+            
+            ideas = ideas[:count]
+            for i, idea in enumerate(ideas):
+                idea.setdefault('id', i + 1)
+            
+            batch_id = f"batch_{int(time.time())}"
+            self.job_store.create_batch(batch_id, ideas, ideas_file=ideas_file)
+            logger.info(f"Batch id: {batch_id} (resume with --resume {batch_id})")
         
         # Process ideas
-        results = self.process_batch(ideas[:count])
+        try:
+            results = self.process_batch(ideas, batch_id=batch_id)
+        except KeyboardInterrupt:
+            if self.render_pool:
+                self.render_pool.shutdown(cancel=True)
+            raise
+        
+        produced = [idea for idea in ideas if not idea.get('duplicate_of')]
+        self.job_store.set_batch_status(batch_id, 'complete' if len(results) == len(produced) else 'partial')
+        
+        elapsed_time = time.time() - start_time
+        stats = self.get_stats()
         
         # Save results
         results_file = f"batch_results_{int(time.time())}.json"
         with open(results_file, 'w') as f:
-            json.dump(results, f, indent=2)
+            json.dump({'batch_id': batch_id, 'results': results, 'stats': stats}, f, indent=2)
         
-        elapsed_time = time.time() - start_time
         logger.info(f"Batch processing completed in {elapsed_time:.2f} seconds")
         logger.info(f"Successfully created {len(results)} videos out of {count} ideas")
+        logger.info(f"Clip cache stats: {stats['clip_cache']}")
+        logger.info(
+            f"Rendition picking: {stats['renditions']['downloaded_bytes']} bytes downloaded, "
+            f"~{stats['renditions']['estimated_bytes_saved']} bytes saved (estimate)"
+        )
         logger.info(f"Results saved to {results_file}")
         
         return results
@@ -119,10 +305,36 @@ class BatchProcessor:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='TikTok Video Batch Processor')
     parser.add_argument('--count', type=int, default=10, help='Number of videos to generate')
-    parser.add_argument('--workers', type=int, default=4, help='Number of worker threads')
+    parser.add_argument('--workers', type=int, default=4, help='Default number of workers per stage')
+    parser.add_argument('--voice-workers', type=int, help='Number of voiceover workers')
+    parser.add_argument('--clip-workers', type=int, help='Number of clip download workers')
+    parser.add_argument('--render-workers', type=int, help='Number of render workers')
+    parser.add_argument('--queue-size', type=int, help='Max videos waiting between stages')
     parser.add_argument('--ideas', help='Path to existing ideas JSON file')
+    parser.add_argument('--idea-concurrency', type=int, help='Number of ideas to generate concurrently')
+    parser.add_argument('--idea-batch-size', type=int, help='Number of scripts to request per LLM call')
+    parser.add_argument('--resume', metavar='BATCH_ID', help='Resume an interrupted batch, skipping completed stages')
+    parser.add_argument('--metrics-textfile', help='Write Prometheus metrics to this file when the run ends')
+    parser.add_argument('--pushgateway', help='Push Prometheus metrics to this Pushgateway (host:port) when the run ends')
     
     args = parser.parse_args()
     
-    processor = BatchProcessor(max_workers=args.workers)
-    processor.run(count=args.count, ideas_file=args.ideas)
\ No newline at end of file
+    processor = BatchProcessor(
+        max_workers=args.workers,
+        idea_concurrency=args.idea_concurrency,
+        voice_workers=args.voice_workers,
+        clip_workers=args.clip_workers,
+        render_workers=args.render_workers,
+        queue_size=args.queue_size,
+        idea_batch_size=args.idea_batch_size
+    )
+    metrics_config = load_json('config.json').get('metrics_settings', {})
+    try:
+        processor.run(count=args.count, ideas_file=args.ideas, resume=args.resume)
+    finally:
+        processor.close()
+        metrics.export(
+            textfile=args.metrics_textfile or metrics_config.get('textfile'),
+            pushgateway=args.pushgateway or metrics_config.get('pushgateway'),
+            job=metrics_config.get('job', 'tiktok_batch')
+        )
\ No newline at end of file
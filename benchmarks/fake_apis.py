@@ -0,0 +1,349 @@
+"""Local stand-ins for the OpenAI, ElevenLabs and Pexels APIs.
+
+One threaded HTTP server answers:
+  POST /v1/chat/completions            chat completion with a JSON script, or an
+                                       array of them for batched prompts
+  POST /v1/text-to-speech/<voice_id>   synthetic MP3, ~0.4 s per word
+  POST /v1/text-to-speech/<voice_id>/with-timestamps
+                                       the same MP3 as base64, with character timings
+  GET  /videos/search                  Pexels-style search results
+  GET  /clips/<name>.mp4               synthetic clips, with HEAD and Range support
+
+Each service gets its own latency, and a share of requests can be failed
+with HTTP 503/429 to exercise the retry paths. Point the app at it with
+OPENAI_API_BASE=<base>/v1, ELEVENLABS_API_BASE=<base> and PEXELS_API_BASE=<base>.
+"""
+import os
+import re
+import sys
+import json
+import base64
+import time
+import random
+import hashlib
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.media import run_ffmpeg
+
+SECONDS_PER_WORD = 0.4
+
+# (name, width, height, fps) of the synthetic clip renditions
+RENDITIONS = (
+    ('uhd', 2160, 3840, 30),
+    ('hd', 1080, 1920, 30),
+    ('sd', 720, 1280, 30),
+)
+
+SERVICES = ('openai', 'tts', 'pexels', 'download')
+
+class FakeAPIs:
+    """Threaded fake provider server; use start()/stop() or as a context manager"""
+
+    def __init__(self, latency=None, error_rate=0.0, clip_seconds=6, seed=0, asset_dir=None, host='127.0.0.1', port=0):
+        self.latency = {service: 0.0 for service in SERVICES}
+        if isinstance(latency, dict):
+            self.latency.update(latency)
+        elif latency:
+            self.latency = {service: float(latency) for service in SERVICES}
+        self.error_rate = error_rate
+        self.clip_seconds = clip_seconds
+        self.random = random.Random(seed)
+        self.asset_dir = asset_dir or tempfile.mkdtemp(prefix='fake_apis_')
+        self.host = host
+        self.port = port
+
+        self.lock = threading.Lock()
+        self.stats = {service: {'requests': 0, 'errors': 0, 'bytes': 0} for service in SERVICES}
+        self.clips = {}
+        self.audio = {}
+        self.server = None
+        self.thread = None
+
+    # Synthetic media
+
+    def _make_clips(self):
+        """Render one test-pattern clip per rendition"""
+        for name, width, height, fps in RENDITIONS:
+            path = os.path.join(self.asset_dir, f"{name}.mp4")
+            if not os.path.exists(path):
+                run_ffmpeg([
+                    '-f', 'lavfi', '-i', f"testsrc2=size={width}x{height}:rate={fps}:duration={self.clip_seconds}",
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', path
+                ])
+            self.clips[name] = path
+
+    def _audio_for(self, text):
+        """MP3 bytes whose duration follows the word count of text"""
+        seconds = max(1, round(len(text.split()) * SECONDS_PER_WORD))
+        with self.lock:
+            data = self.audio.get(seconds)
+        if data is None:
+            path = os.path.join(self.asset_dir, f"tone_{seconds}s.mp3")
+            if not os.path.exists(path):
+                run_ffmpeg([
+                    '-f', 'lavfi', '-i', f"sine=frequency=220:duration={seconds}",
+                    '-ar', '44100', '-b:a', '64k', path
+                ])
+            with open(path, 'rb') as f:
+                data = f.read()
+            with self.lock:
+                self.audio[seconds] = data
+        return data
+
+    def _alignment(self, text, seconds):
+        """Character timings spread evenly over the audio, like ElevenLabs' alignment"""
+        step = seconds / max(1, len(text))
+        return {
+            'characters': list(text),
+            'character_start_times_seconds': [round(i * step, 3) for i in range(len(text))],
+            'character_end_times_seconds': [round((i + 1) * step, 3) for i in range(len(text))]
+        }
+
+    def _script(self, prompt):
+        words = [w.strip('.,:"()') for w in prompt.split() if len(w) > 4][:6]
+        topic = ' '.join(words) or 'productivity'
+        return {
+            'hook': f"Stop scrolling, this changes how you think about {topic}.",
+            'body': (
+                f"First, start small with {topic} every single day. "
+                "Second, track what works and drop what does not. "
+                "Third, share your progress so other people keep you honest."
+            ),
+            'cta': "Follow for more and comment your favourite tip!"
+        }
+
+    def _search(self, query, per_page):
+        """Pexels search response with distinct video ids per query"""
+        base_id = int(hashlib.sha256(query.encode()).hexdigest()[:8], 16)
+        videos = []
+        for n in range(per_page):
+            video_id = base_id + n
+            videos.append({
+                'id': video_id,
+                'duration': self.clip_seconds,
+                'url': f"https://www.pexels.com/video/{query.replace(' ', '-')}-{video_id}/",
+                'video_files': [
+                    {
+                        'id': video_id * 10 + i,
+                        'quality': name,
+                        'file_type': 'video/mp4',
+                        'width': width,
+                        'height': height,
+                        'fps': fps,
+                        'link': f"{self.base_url}/clips/{name}.mp4?v={video_id}"
+                    }
+                    for i, (name, width, height, fps) in enumerate(RENDITIONS)
+                ]
+            })
+        return {'page': 1, 'per_page': per_page, 'total_results': per_page, 'videos': videos}
+
+    # Request accounting
+
+    def _begin(self, service):
+        """Apply latency and decide whether to inject an error; returns an error status or None"""
+        delay = self.latency.get(service, 0.0)
+        if delay:
+            time.sleep(delay)
+        with self.lock:
+            self.stats[service]['requests'] += 1
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats[service]['errors'] += 1
+                return self.random.choice((503, 429))
+        return None
+
+    def _sent(self, service, size):
+        with self.lock:
+            self.stats[service]['bytes'] += size
+
+    def get_stats(self):
+        with self.lock:
+            return {service: dict(stats) for service, stats in self.stats.items()}
+
+    # Server
+
+    def _handler(self):
+        apis = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body=b'', content_type='application/json', headers=None, service=None, head=False):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+                    if service:
+                        apis._sent(service, len(body))
+
+            def _json(self, status, payload, service=None):
+                self._send(status, json.dumps(payload).encode(), service=service)
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                if path.endswith('/chat/completions'):
+                    service = 'openai'
+                elif path.startswith('/v1/text-to-speech/'):
+                    service = 'tts'
+                else:
+                    return self._json(404, {'error': 'not found'})
+
+                request = self._body()
+                error = apis._begin(service)
+                if error:
+                    return self._json(error, {'error': {'message': 'injected failure', 'type': 'server_error'}})
+
+                if service == 'openai':
+                    prompt = '\n'.join(m.get('content', '') for m in request.get('messages', []))
+                    batch = re.search(r'JSON array of exactly (\d+)', prompt)
+                    if batch:
+                        # One script per numbered topic line
+                        topics = re.findall(r'^\s*\d+\. (.+)$', prompt, re.MULTILINE)[:int(batch.group(1))]
+                        content = json.dumps([apis._script(topic) for topic in topics])
+                    else:
+                        content = json.dumps(apis._script(prompt))
+                    return self._json(200, {
+                        'id': f"chatcmpl-{int(time.time() * 1000)}",
+                        'object': 'chat.completion',
+                        'created': int(time.time()),
+                        'model': request.get('model', 'gpt-4'),
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': content},
+                            'finish_reason': 'stop'
+                        }],
+                        'usage': {'prompt_tokens': len(prompt.split()), 'completion_tokens': len(content.split()),
+                                  'total_tokens': len(prompt.split()) + len(content.split())}
+                    }, service=service)
+
+                text = request.get('text', '')
+                if path.endswith('/with-timestamps'):
+                    alignment = apis._alignment(text, max(1, round(len(text.split()) * SECONDS_PER_WORD)))
+                    return self._json(200, {
+                        'audio_base64': base64.b64encode(apis._audio_for(text)).decode(),
+                        'alignment': alignment,
+                        'normalized_alignment': alignment
+                    }, service=service)
+                self._send(200, apis._audio_for(text), content_type='audio/mpeg', service=service)
+
+            def do_GET(self, head=False):
+                url = urlparse(self.path)
+                if url.path == '/videos/search':
+                    error = apis._begin('pexels')
+                    if error:
+                        return self._json(error, {'error': 'injected failure'})
+                    query = parse_qs(url.query)
+                    return self._json(200, apis._search(
+                        query.get('query', ['stock'])[0], int(query.get('per_page', ['1'])[0])
+                    ), service='pexels')
+
+                if url.path.startswith('/clips/'):
+                    name = os.path.splitext(os.path.basename(url.path))[0]
+                    if name not in apis.clips:
+                        return self._json(404, {'error': 'not found'})
+                    error = apis._begin('download')
+                    if error:
+                        return self._json(error, {'error': 'injected failure'})
+                    return self._clip(apis.clips[name], head)
+
+                self._json(404, {'error': 'not found'})
+
+            def do_HEAD(self):
+                self.do_GET(head=True)
+
+            def _clip(self, path, head):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                size = len(data)
+                headers = {'Accept-Ranges': 'bytes'}
+
+                range_header = self.headers.get('Range', '')
+                if range_header.startswith('bytes=') and not head:
+                    start, _, end = range_header[6:].partition('-')
+                    start = int(start or 0)
+                    end = min(int(end) if end else size - 1, size - 1)
+                    if start >= size:
+                        return self._send(416, headers={'Content-Range': f"bytes */{size}"})
+                    headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+                    return self._send(206, data[start:end + 1], 'video/mp4', headers, service='download')
+
+                if head:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'video/mp4')
+                    self.send_header('Content-Length', str(size))
+                    self.send_header('Accept-Ranges', 'bytes')
+                    self.end_headers()
+                    return
+                self._send(200, data, 'video/mp4', headers, service='download')
+
+        return Handler
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.server.server_address[1]}"
+
+    def env(self):
+        """Environment variables that point the app at this server"""
+        return {
+            'OPENAI_API_BASE': f"{self.base_url}/v1",
+            'OPENAI_API_KEY': 'fake-openai-key',
+            'ELEVENLABS_API_BASE': self.base_url,
+            'ELEVENLABS_API_KEY': 'fake-elevenlabs-key',
+            'PEXELS_API_BASE': self.base_url,
+            'PEXELS_API_KEY': 'fake-pexels-key',
+            'NO_PROXY': self.host,
+            'no_proxy': self.host
+        }
+
+    def start(self):
+        self._make_clips()
+        self.server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-apis', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve fake OpenAI, ElevenLabs and Pexels APIs')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 503/429')
+    parser.add_argument('--clip-seconds', type=int, default=6)
+    args = parser.parse_args()
+
+    apis = FakeAPIs(latency=args.latency, error_rate=args.error_rate, clip_seconds=args.clip_seconds, port=args.port)
+    apis.start()
+    for key, value in apis.env().items():
+        print(f"export {key}={value}")
+    try:
+        apis.thread.join()
+    except KeyboardInterrupt:
+        apis.stop()
@@ -0,0 +1,266 @@
+"""Offline end-to-end benchmark against the fake provider APIs.
+
+Scenarios, each run in a fresh interpreter and scratch directory:
+  editor  VideoEditor.create_video on synthetic audio and clips
+  single  main.generate_single_video
+  batch   BatchProcessor.run
+
+For every scenario the result holds per-stage latency (idea, voice, clips,
+render), wall time, videos/hour and peak RSS of the process and of its
+children (ffmpeg, render workers). Results are written as JSON; pass
+--compare with an earlier result file to print the change per metric.
+
+    python benchmarks/run.py --videos 3 --engine ffmpeg --latency 0.2
+    python benchmarks/run.py --compare benchmarks/results/bench_1700000000.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ('editor', 'single', 'batch')
+
+# Stage name -> (module, class, method) timed in every scenario
+STAGES = {
+    'idea': ('modules.idea_generator', 'IdeaGenerator', 'generate_video_idea'),
+    # One call per LLM request when idea_settings.batch_size > 1
+    'idea_batch': ('modules.idea_generator', 'IdeaGenerator', 'generate_idea_batch'),
+    'voice': ('modules.voice_generator', 'VoiceGenerator', 'generate_from_script'),
+    'clips': ('modules.video_selector', 'VideoSelector', 'select_videos_for_script'),
+    'render': ('modules.video_editor', 'VideoEditor', 'create_video'),
+}
+
+SCRIPT = {
+    'hook': "Stop scrolling, this changes how you think about your mornings.",
+    'body': (
+        "First, start small with one habit every single day. "
+        "Second, track what works and drop what does not. "
+        "Third, share your progress so other people keep you honest."
+    ),
+    'cta': "Follow for more and comment your favourite tip!"
+}
+
+# Worker side: runs inside the scratch directory
+
+def _instrument(timings):
+    """Time every call of the stage methods into timings[stage]"""
+    import importlib
+    import functools
+
+    for stage, (module_name, class_name, method_name) in STAGES.items():
+        cls = getattr(importlib.import_module(module_name), class_name)
+        method = getattr(cls, method_name)
+
+        def timed(method, stage):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    timings.setdefault(stage, []).append(time.perf_counter() - start)
+            return wrapper
+
+        setattr(cls, method_name, timed(method, stage))
+
+def _fetch_inputs(count):
+    """Synthetic voiceover and clips for the editor scenario, fetched outside the timed section"""
+    from modules.voice_generator import VoiceGenerator
+    from modules.video_selector import VideoSelector
+
+    audio_file = VoiceGenerator().generate_from_script(SCRIPT)
+    video_files = VideoSelector().select_videos_for_script(SCRIPT, num_videos=count)
+    return audio_file, video_files
+
+def _run_editor(videos):
+    audio_file, video_files = _fetch_inputs(3)
+    if not audio_file or not video_files:
+        raise RuntimeError("Could not fetch synthetic inputs from the fake APIs")
+
+    timings = {}
+    _instrument(timings)
+    from modules.video_editor import VideoEditor
+
+    editor = VideoEditor()
+    produced = 0
+    for i in range(videos):
+        if editor.create_video(SCRIPT, video_files, audio_file, output_name=f"bench_editor_{i}.mp4"):
+            produced += 1
+    return timings, produced
+
+def _run_single(videos):
+    timings = {}
+    _instrument(timings)
+    import main
+
+    produced = 0
+    for i in range(videos):
+        output = f"bench_single_{i}.mp4"
+        main.generate_single_video(argparse.Namespace(category=None, audience=None, trend=None, output=output))
+        if os.path.exists(os.path.join('assets/output', output)):
+            produced += 1
+    return timings, produced
+
+def _run_batch(videos, workers):
+    timings = {}
+    _instrument(timings)
+    from batch_processor import BatchProcessor
+
+    processor = BatchProcessor(max_workers=workers)
+    try:
+        results = processor.run(count=videos)
+    finally:
+        processor.close()
+    return timings, sum(1 for result in results or [] if result.get('video_path'))
+
+def worker(args):
+    start = time.perf_counter()
+    if args.scenario == 'editor':
+        timings, produced = _run_editor(args.videos)
+    elif args.scenario == 'single':
+        timings, produced = _run_single(args.videos)
+    else:
+        timings, produced = _run_batch(args.videos, args.workers)
+    wall = time.perf_counter() - start
+
+    print(json.dumps({
+        'wall_seconds': wall,
+        'videos': produced,
+        'timings': timings,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'children_peak_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    }))
+
+# Driver side
+
+def _latency_summary(samples):
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'mean': round(statistics.mean(samples), 4),
+        'p50': round(statistics.median(samples), 4),
+        'p95': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        'max': round(samples[-1], 4)
+    }
+
+def _scratch_dir(engine):
+    """Working directory with the repo's config and data, but empty assets"""
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    shutil.copytree(os.path.join(ROOT, 'data'), os.path.join(workdir, 'data'),
+                    ignore=shutil.ignore_patterns('jobs.db*'))
+    with open(os.path.join(ROOT, 'config.json')) as f:
+        config = json.load(f)
+    if engine:
+        config.setdefault('video_settings', {})['engine'] = engine
+    with open(os.path.join(workdir, 'config.json'), 'w') as f:
+        json.dump(config, f, indent=2)
+    return workdir
+
+def run_scenario(scenario, apis, args):
+    workdir = _scratch_dir(args.engine)
+    env = dict(os.environ, **apis.env())
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    try:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', '--scenario', scenario,
+             '--videos', str(args.videos), '--workers', str(args.workers)],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'worker failed'}
+
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        wall = data['wall_seconds']
+        return {
+            'wall_seconds': round(wall, 3),
+            'videos': data['videos'],
+            'videos_per_hour': round(data['videos'] / wall * 3600, 1) if wall else 0.0,
+            'stages': {stage: _latency_summary(samples) for stage, samples in data['timings'].items() if samples},
+            'peak_rss_mb': round(data['peak_rss_mb'], 1),
+            'children_peak_rss_mb': round(data['children_peak_rss_mb'], 1)
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def _flatten(result, prefix=''):
+    flat = {}
+    for key, value in result.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(current, baseline_file):
+    """Print the relative change of every numeric metric against a baseline result"""
+    with open(baseline_file) as f:
+        baseline = _flatten(json.load(f).get('scenarios', {}))
+    for name, value in sorted(_flatten(current['scenarios']).items()):
+        before = baseline.get(name)
+        if before:
+            print(f"{name:55s} {before:>12.3f} -> {value:>12.3f} ({(value - before) / before * 100:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark with fake provider APIs')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Scenario to run (default: all)')
+    parser.add_argument('--videos', type=int, default=2, help='Videos per scenario')
+    parser.add_argument('--workers', type=int, default=2, help='Workers per stage for the batch scenario')
+    parser.add_argument('--engine', choices=('moviepy', 'ffmpeg'), help='Override video_settings.engine')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every fake API request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of fake API requests that fail')
+    parser.add_argument('--clip-seconds', type=int, default=6, help='Duration of the synthetic clips')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/bench_<timestamp>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='Earlier result file to compare against')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch directories')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        args.scenario = args.scenario[0]
+        return worker(args)
+
+    from benchmarks.fake_apis import FakeAPIs
+
+    results = {
+        'timestamp': int(time.time()),
+        'python': sys.version.split()[0],
+        'settings': {
+            'videos': args.videos,
+            'workers': args.workers,
+            'engine': args.engine,
+            'latency': args.latency,
+            'error_rate': args.error_rate,
+            'clip_seconds': args.clip_seconds
+        },
+        'scenarios': {}
+    }
+
+    with FakeAPIs(latency=args.latency, error_rate=args.error_rate, clip_seconds=args.clip_seconds) as apis:
+        for scenario in args.scenario or SCENARIOS:
+            print(f"Running {scenario}...", file=sys.stderr)
+            results['scenarios'][scenario] = run_scenario(scenario, apis, args)
+        results['fake_apis'] = apis.get_stats()
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f"bench_{results['timestamp']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results['scenarios'], indent=2))
+    print(f"Results saved to {output}", file=sys.stderr)
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
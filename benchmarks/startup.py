@@ -0,0 +1,107 @@
+"""Startup-time benchmark for the CLI and web entry points.
+
+Measures, in fresh interpreters:
+  - cold import time of main, batch_processor and app, and whether the
+    import pulled in moviepy or numpy
+  - wall time of `main.py --help` and `batch_processor.py --help`
+  - first-request latency of the web app (GET / and an unknown job lookup)
+
+Run from the repository root:
+    python benchmarks/startup.py --runs 5 --output benchmarks/startup_results.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('moviepy.editor', 'numpy', 'openai')
+
+IMPORT_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': {{m: m in sys.modules for m in {heavy!r}}}}}))
+"""
+
+REQUEST_PROBE = """
+import time, json
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+client = app.app.test_client()
+timings = {{'import': imported}}
+for name, path in (('index', '/'), ('job_status', '/jobs/unknown')):
+    t = time.perf_counter()
+    client.get(path)
+    timings[name] = time.perf_counter() - t
+timings['total'] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+def _python(code):
+    """Run code in a fresh interpreter from the repo root and parse its JSON output"""
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, check=True,
+        capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def _wall(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=ROOT, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+def _summary(samples):
+    return {
+        'median': round(statistics.median(samples), 4),
+        'min': round(min(samples), 4),
+        'max': round(max(samples), 4)
+    }
+
+def bench_imports(runs):
+    results = {}
+    for module in ('main', 'batch_processor', 'app'):
+        samples = [_python(IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)) for _ in range(runs)]
+        results[module] = dict(
+            _summary([s['seconds'] for s in samples]),
+            loaded=samples[-1]['loaded']
+        )
+    return results
+
+def bench_help(runs):
+    return {
+        script: _summary([_wall([script, '--help']) for _ in range(runs)])
+        for script in ('main.py', 'batch_processor.py')
+    }
+
+def bench_first_request(runs):
+    samples = [_python(REQUEST_PROBE.format()) for _ in range(runs)]
+    return {key: _summary([s[key] for s in samples]) for key in samples[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure entry point startup time')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per measurement')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+        'cold_import': bench_imports(args.runs),
+        'help': bench_help(args.runs),
+        'first_request': bench_first_request(args.runs)
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
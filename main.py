@@ -3,10 +3,6 @@ import argparse
 import json
 import time
 from dotenv import load_dotenv
-from modules.idea_generator import IdeaGenerator
-from modules.voice_generator import VoiceGenerator
-from modules.video_selector import VideoSelector
-from modules.video_editor import VideoEditor
 from utils.logger import setup_logger
 
 # Load environment variables
@@ -20,6 +16,12 @@ def generate_single_video(args):
     try:
         logger.info("Starting single video generation process")
         
+        from modules.idea_generator import IdeaGenerator
+        from modules.voice_generator import VoiceGenerator
+        from modules.video_selector import VideoSelector
+        from modules.video_editor import VideoEditor
+        from modules.video_pipeline import VideoPipeline
+        
         # Initialize modules
         idea_gen = IdeaGenerator()
         voice_gen = VoiceGenerator()
@@ -42,32 +44,20 @@ def generate_single_video(args):
         with open(f"video_idea_{int(time.time())}.json", 'w') as f:
             json.dump(video_idea, f, indent=2)
         
-        # Generate voiceover
-        logger.info("Generating voiceover")
-        audio_file = voice_gen.generate_from_script(video_idea['script'])
-        
-        if not audio_file:
-            logger.error("Failed to generate voiceover")
-            return
-        
-        # Select video clips
-        logger.info("Selecting video clips")
-        video_files = video_sel.select_videos_for_script(video_idea['script'])
+        # Generate voiceover and select clips concurrently, then render
+        logger.info("Generating voiceover and selecting video clips")
+        pipeline = VideoPipeline(voice_gen, video_sel, video_ed)
+        result = pipeline.produce(video_idea['script'], output_name=args.output)
         
-        if not video_files:
-            logger.error("Failed to select video clips")
+        if result['error']:
+            logger.error(result['error'])
             return
         
-        # Create final video
-        logger.info("Creating final video")
-        output_video = video_ed.create_video(
-            video_idea['script'],
-            video_files,
-            audio_file,
-            output_name=args.output
-        )
+        output_video = result['video_path']
         
         if output_video:
+            if idea_gen.script_index:
+                idea_gen.script_index.record(video_idea['script'], title=video_idea['title'])
             logger.info(f"Video generation complete: {output_video}")
             print(f"Video successfully generated: {output_video}")
         else:
@@ -82,50 +72,55 @@ def generate_multiple_videos(args):
         logger.info(f"Starting batch generation of {args.count} videos")
         
         # Initialize idea generator
+        from modules.idea_generator import IdeaGenerator
         idea_gen = IdeaGenerator()
         
         # Generate multiple ideas
         ideas_file = f"video_ideas_{int(time.time())}.json"
-        ideas = idea_gen.generate_multiple_ideas(count=args.count, output_file=ideas_file)
+        report = {}
+        ideas = idea_gen.generate_multiple_ideas(
+            count=args.count,
+            output_file=ideas_file,
+            concurrency=args.concurrency,
+            batch_size=args.batch_size,
+            report=report
+        )
         
         logger.info(f"Generated {len(ideas)} video ideas, saved to {ideas_file}")
+        if report['failed_ids']:
+            print(f"Failed to generate {len(report['failed_ids'])} of {args.count} ideas: {report['failed_ids']}")
+        if report['duplicate_ids']:
+            print(f"Flagged {len(report['duplicate_ids'])} near-duplicate ideas: {report['duplicate_ids']}")
         
         if args.produce:
-            # Initialize other modules
+            # Initialize other modules; the media stack is only loaded when producing
+            from modules.voice_generator import VoiceGenerator
+            from modules.video_selector import VideoSelector
+            from modules.video_editor import VideoEditor
+            from modules.video_pipeline import VideoPipeline
             voice_gen = VoiceGenerator()
             video_sel = VideoSelector()
             video_ed = VideoEditor()
+            pipeline = VideoPipeline(voice_gen, video_sel, video_ed)
             
             # Process each idea
             for i, idea in enumerate(ideas):
+                if idea.get('duplicate_of'):
+                    logger.info(f"Skipping video {i+1}/{len(ideas)}, near-duplicate of {idea['duplicate_of']['title']}")
+                    continue
                 try:
                     logger.info(f"Processing video {i+1}/{len(ideas)}: {idea['title']}")
                     
-                    # Generate voiceover
-                    audio_file = voice_gen.generate_from_script(idea['script'])
-                    if not audio_file:
-                        logger.error(f"Failed to generate voiceover for video {i+1}")
-                        continue
-                    
-                    # Select video clips
-                    video_files = video_sel.select_videos_for_script(idea['script'])
-                    if not video_files:
-                        logger.error(f"Failed to select video clips for video {i+1}")
-                        continue
-                    
-                    # Create final video
                     output_name = f"tiktok_batch_{i+1}_{int(time.time())}.mp4"
-                    output_video = video_ed.create_video(
-                        idea['script'],
-                        video_files,
-                        audio_file,
-                        output_name=output_name
-                    )
+                    result = pipeline.produce(idea['script'], output_name=output_name)
+                    output_video = result['video_path']
                     
                     if output_video:
+                        if idea_gen.script_index:
+                            idea_gen.script_index.record(idea['script'], title=idea['title'])
                         logger.info(f"Video {i+1} generation complete: {output_video}")
                     else:
-                        logger.error(f"Failed to create video {i+1}")
+                        logger.error(f"{result['error']} for video {i+1}")
                         
                 except Exception as e:
                     logger.error(f"Error processing video {i+1}: {e}")
@@ -152,6 +147,8 @@ if __name__ == "__main__":
     multi_parser = subparsers.add_parser('multiple', help='Generate multiple videos')
     multi_parser.add_argument('--count', type=int, default=10, help='Number of videos to generate')
     multi_parser.add_argument('--produce', action='store_true', help='Produce videos (not just ideas)')
+    multi_parser.add_argument('--concurrency', type=int, help='Number of ideas to generate concurrently')
+    multi_parser.add_argument('--batch-size', type=int, help='Number of scripts to request per LLM call')
     
     args = parser.parse_args()
     
@@ -0,0 +1,133 @@
+import os
+import hashlib
+import threading
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import load_json, save_json
+from utils import metrics
+from utils.media import run_ffmpeg, parse_resolution
+
+# Set up logger
+logger = setup_logger('clip_normalizer')
+
+def _memo_path(memo_key):
+    """Path part of a `path:size:mtime` memo key"""
+    return memo_key.rsplit(':', 2)[0]
+
+class ClipNormalizer:
+    """Transcode stock clips once to the canonical vertical output format.
+
+    Normalized clips are stored next to the original and tracked by the
+    SHA-256 of the source file, so ingesting the same footage again is free.
+    forget() drops the entries of files the clip cache evicts.
+    """
+
+    def __init__(self, config, index_file='assets/cache/normalized_clips.json'):
+        self.width, self.height = parse_resolution(config.get('resolution', '1080x1920'))
+        self.fps = config.get('fps', 30)
+        self.gop = config.get('normalize_gop', self.fps * 2)
+        self.crf = config.get('normalize_crf', 18)
+        self.index_file = index_file
+        os.makedirs(os.path.dirname(index_file) or '.', exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        index = load_json(index_file) if os.path.exists(index_file) else {}
+        self.normalized = index.get('normalized', {})
+        self.sources = index.get('sources', {})
+        logger.info(f"ClipNormalizer initialized with {len(self.normalized)} normalized clips")
+
+    def normalized_path(self, path):
+        """Where the normalized copy of a clip is stored"""
+        base, _ = os.path.splitext(path)
+        return f"{base}_{self.width}x{self.height}.mp4"
+
+    def is_normalized(self, info):
+        """Whether probed clip metadata already matches the canonical format"""
+        return (
+            info.get('width') == self.width and
+            info.get('height') == self.height and
+            abs((info.get('fps') or 0) - self.fps) < 0.01
+        )
+
+    def source_hash(self, path):
+        """SHA-256 of a clip, memoized by path, size and mtime"""
+        stat = os.stat(path)
+        memo_key = f"{path}:{stat.st_size}:{int(stat.st_mtime)}"
+        with self.lock:
+            if memo_key in self.sources:
+                return self.sources[memo_key]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+
+        with self.lock:
+            # Hashes of earlier versions of this file are stale now
+            for stale in [key for key in self.sources if _memo_path(key) == path]:
+                del self.sources[stale]
+            self.sources[memo_key] = digest.hexdigest()
+            return self.sources[memo_key]
+
+    def forget(self, paths):
+        """Drop index entries that refer to deleted files (sources or normalized copies)"""
+        paths = set(paths)
+        with self.lock:
+            stale_sources = [key for key in self.sources if _memo_path(key) in paths]
+            stale_normalized = [
+                source_hash for source_hash, entry in self.normalized.items()
+                if entry['path'] in paths or entry['source'] in paths
+            ]
+            for key in stale_sources:
+                del self.sources[key]
+            for source_hash in stale_normalized:
+                del self.normalized[source_hash]
+            if stale_sources or stale_normalized:
+                save_json({'normalized': self.normalized, 'sources': self.sources}, self.index_file)
+
+    def ingest(self, path):
+        """Return the normalized copy of a clip, transcoding it on first sight"""
+        try:
+            source_hash = self.source_hash(path)
+            with self.lock:
+                key_lock = self.key_locks.setdefault(source_hash, threading.Lock())
+
+            with key_lock:
+                with self.lock:
+                    entry = self.normalized.get(source_hash)
+                if entry and os.path.exists(entry['path']):
+                    return entry['path']
+
+                output_path = self.normalized_path(path)
+                tmp_path = f"{output_path}.tmp.mp4"
+                logger.info(f"Normalizing {path} to {self.width}x{self.height}@{self.fps}")
+                with metrics.stage_timer('normalize'):
+                    run_ffmpeg([
+                        '-i', path,
+                        '-vf', (
+                            f"scale={self.width}:{self.height}:force_original_aspect_ratio=increase,"
+                            f"crop={self.width}:{self.height},setsar=1,fps={self.fps}"
+                        ),
+                        '-c:v', 'libx264',
+                        '-preset', 'veryfast',
+                        '-crf', str(self.crf),
+                        '-g', str(self.gop),
+                        '-keyint_min', str(self.gop),
+                        '-sc_threshold', '0',
+                        '-pix_fmt', 'yuv420p',
+                        '-an',
+                        '-movflags', '+faststart',
+                        tmp_path
+                    ])
+                os.replace(tmp_path, output_path)
+
+                with self.lock:
+                    self.normalized[source_hash] = {'source': path, 'path': output_path}
+                    save_json({'normalized': self.normalized, 'sources': self.sources}, self.index_file)
+                return output_path
+
+        except Exception as e:
+            logger.error(f"Error normalizing clip {path}: {e}")
+            return path
@@ -0,0 +1,79 @@
+import os
+import math
+import threading
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import load_json, save_json
+from utils.media import probe
+
+# Set up logger
+logger = setup_logger('cut_planner')
+
+class CutPlanner:
+    """Plan which parts of which clips fill the voiceover, from probed metadata only.
+
+    Clip metadata comes from ffprobe and is cached on disk by path, size and
+    mtime, so planning never starts a decoder and a clip is probed once. A
+    plan is a list of cuts: dicts with the clip `file`, the `in` and `out`
+    points in seconds, how many times the [in, out] span plays (`loops`),
+    the resulting `duration` and the probed `info`.
+    """
+
+    def __init__(self, cache_file='assets/cache/probe_cache.json'):
+        self.cache_file = cache_file
+        os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+
+        self.lock = threading.Lock()
+        cached = load_json(cache_file).get('probes', {}) if os.path.exists(cache_file) else {}
+        self.probes = {path: entry for path, entry in cached.items() if os.path.exists(path)}
+
+    def info(self, path):
+        """Probe metadata for a media file, from the cache when it is unchanged"""
+        stat = os.stat(path)
+        signature = f"{stat.st_size}:{stat.st_mtime}"
+        with self.lock:
+            entry = self.probes.get(path)
+            if entry and entry['signature'] == signature:
+                return entry['info']
+
+        info = probe(path)
+        with self.lock:
+            self.probes[path] = {'signature': signature, 'info': info}
+            save_json({'probes': self.probes}, self.cache_file)
+        return info
+
+    def plan(self, video_files, duration):
+        """Cut list that fills `duration` seconds, looping the last usable clip if needed"""
+        cuts = []
+        remaining = duration
+
+        for video_file in video_files:
+            if remaining <= 0:
+                break
+            try:
+                info = self.info(video_file)
+            except Exception as e:
+                logger.error(f"Skipping clip {video_file}: {e}")
+                continue
+
+            clip_duration = info.get('duration') or 0
+            if clip_duration <= 0:
+                logger.warning(f"Skipping clip without duration: {video_file}")
+                continue
+
+            take = min(clip_duration, remaining)
+            cuts.append({'file': video_file, 'in': 0.0, 'out': take, 'loops': 1, 'duration': take, 'info': info})
+            remaining -= take
+
+        # Not enough footage: loop the whole of the last clip
+        if remaining > 1e-3 and cuts:
+            last = cuts[-1]
+            clip_duration = last['info']['duration']
+            total = last['duration'] + remaining
+            last['out'] = clip_duration
+            last['loops'] = int(math.ceil(total / clip_duration))
+            last['duration'] = total
+
+        logger.info(f"Planned {len(cuts)} cuts from {len(video_files)} clips for {duration:.2f}s")
+        return cuts
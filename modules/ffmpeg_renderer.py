@@ -0,0 +1,230 @@
+import os
+import time
+import shutil
+import tempfile
+import textwrap
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.media import run_ffmpeg, parse_resolution, escape_filter_value, caption_scale
+from utils import metrics
+from modules.cut_planner import CutPlanner
+from modules.subtitles import subtitles_filter
+
+# Set up logger
+logger = setup_logger('ffmpeg_renderer')
+
+class FFmpegRenderer:
+    """Render a video with a single ffmpeg filtergraph instead of per-frame moviepy compositing"""
+
+    def __init__(self, config, planner=None):
+        self.config = config
+        self.planner = planner or CutPlanner()
+        self.width, self.height = parse_resolution(config.get('resolution', '1080x1920'))
+        self.fps = config.get('fps', 30)
+        self.bitrate = config.get('bitrate', "8000k")
+        self.preset = config.get('preset', 'medium')
+        self.font_file = config.get('font_file')
+        self.scale = caption_scale(self.width)
+
+    def _drawtext(self, text_file, fontsize, color, position, start, end, box=False):
+        options = [
+            f"textfile='{escape_filter_value(text_file)}'",
+            f"fontsize={fontsize}",
+            f"fontcolor={color}",
+            f"line_spacing={round(10 * self.scale)}",
+            "x=(w-text_w)/2",
+            "y=(h-text_h)/2" if position == 'center' else f"y=h-text_h-{round(60 * self.scale)}",
+            f"enable='between(t,{start:.3f},{end:.3f})'"
+        ]
+        if self.font_file:
+            options.append(f"fontfile='{escape_filter_value(self.font_file)}'")
+        else:
+            options.append("font='Arial'")
+        if box:
+            options.extend(["box=1", "boxcolor=black", f"boxborderw={round(20 * self.scale)}"])
+        return "drawtext=" + ":".join(options)
+
+    def _caption_filters(self, script, duration, work_dir, prefix='caption'):
+        """drawtext filters matching the moviepy caption layout"""
+        captions = [
+            # (text, fontsize, color, position, start, end, box, margin)
+            (script['hook'], 70, 'white', 'center', 0, min(3, duration), True, 40),
+            (script['body'][:100] + "...", 50, 'white', 'bottom', 3, max(3, duration - 10), False, 80),
+            (script['cta'], 60, 'yellow', 'center', max(0, duration - 10), duration, False, 40)
+        ]
+
+        filters = []
+        for index, (text, fontsize, color, position, start, end, box, margin) in enumerate(captions):
+            if end <= start:
+                continue
+            fontsize = max(8, round(fontsize * self.scale))
+            margin = margin * self.scale
+            # drawtext does not wrap, so wrap to roughly the caption box width
+            chars_per_line = max(10, int((self.width - margin) / (fontsize * 0.55)))
+            text_file = os.path.join(work_dir, f"{prefix}_{index}.txt")
+            with open(text_file, 'w') as f:
+                f.write(textwrap.fill(text, width=chars_per_line))
+            filters.append(self._drawtext(text_file, fontsize, color, position, start, end, box=box))
+        return filters
+
+    def _base_graph(self, cuts):
+        """Input args and filters that decode, scale and concatenate the cuts into [base]"""
+        args = []
+        filters = []
+        for index, cut in enumerate(cuts):
+            if cut['loops'] > 1:
+                args += ['-stream_loop', str(cut['loops'] - 1)]
+            if cut['in'] > 0:
+                args += ['-ss', f"{cut['in']:.3f}"]
+            args += ['-t', f"{cut['duration']:.3f}", '-i', cut['file']]
+
+            info = cut['info']
+            if (info.get('width'), info.get('height')) == (self.width, self.height) and \
+                    abs((info.get('fps') or 0) - self.fps) < 0.01:
+                # Already normalized on ingest, no rescale needed
+                filters.append(f"[{index}:v]setsar=1,format=yuv420p[v{index}]")
+                continue
+
+            # Cover-scale to the output size, then centre crop
+            filters.append(
+                f"[{index}:v]scale={self.width}:{self.height}:force_original_aspect_ratio=increase,"
+                f"crop={self.width}:{self.height},setsar=1,fps={self.fps},format=yuv420p[v{index}]"
+            )
+
+        inputs = ''.join(f"[v{index}]" for index in range(len(cuts)))
+        filters.append(f"{inputs}concat=n={len(cuts)}:v=1:a=0[base]")
+        return args, filters
+
+    def _caption_outputs(self, scripts, label, audio, duration, work_dir, subtitle_files=None):
+        """Filters and output args giving each script its own captioned branch of `label`.
+
+        `audio` is the args mapping and encoding the audio of every output.
+        With `subtitle_files`, one per script, the captions are burned in
+        from those tracks instead of drawtext.
+        """
+        # One branch of the base stream per variant
+        count = len(scripts)
+        filters = []
+        if count > 1:
+            filters.append(f"{label}split={count}" + "".join(f"[base{k}]" for k in range(count)))
+            branches = [f"[base{k}]" for k in range(count)]
+        else:
+            branches = [label]
+
+        outputs = []
+        for k, (script, branch) in enumerate(zip(scripts, branches)):
+            if subtitle_files:
+                fonts_dir = os.path.dirname(self.font_file) if self.font_file else None
+                captions = [subtitles_filter(subtitle_files[k], fonts_dir)]
+            else:
+                captions = self._caption_filters(script, duration, work_dir, prefix=f"caption{k}")
+            filters.append(branch + (",".join(captions) or "null") + f"[out{k}]")
+
+            outputs.append(['-map', f"[out{k}]"] + audio + [
+                '-c:v', 'libx264',
+                '-preset', self.preset,
+                '-b:v', self.bitrate,
+                '-r', str(self.fps),
+                '-t', f"{duration:.3f}",
+                '-movflags', '+faststart'
+            ])
+        return filters, outputs
+
+    def _encode(self, args, duration, count):
+        start = time.perf_counter()
+        with metrics.stage_timer('encode'):
+            run_ffmpeg(args)
+        metrics.record_render('ffmpeg', duration * self.fps * count, time.perf_counter() - start)
+
+    def render(self, script, video_files, audio_file, output_path, cuts=None, subtitle_file=None):
+        """Render the video in one ffmpeg invocation and return the output path"""
+        subtitle_files = [subtitle_file] if subtitle_file else None
+        return self.render_variants([script], video_files, audio_file, [output_path], cuts, subtitle_files)[0]
+
+    def render_variants(self, scripts, video_files, audio_file, output_paths, cuts=None, subtitle_files=None):
+        """Render one video per script in a single ffmpeg invocation.
+
+        The clips are decoded, scaled and concatenated once; the base stream
+        is then split and each branch gets its own captions and encoder.
+        Returns the output paths, or a list of None on failure.
+        """
+        audio_duration = self.planner.info(audio_file)['duration']
+        if cuts is None:
+            cuts = self.planner.plan(video_files, audio_duration)
+        if not cuts:
+            logger.error("No video clips available to create video")
+            return [None] * len(output_paths)
+
+        logger.info(
+            f"Rendering {len(cuts)} cuts into {len(output_paths)} variant(s) with ffmpeg, "
+            f"audio duration {audio_duration}s"
+        )
+
+        work_dir = tempfile.mkdtemp(prefix='render_')
+        try:
+            args, filters = self._base_graph(cuts)
+            args += ['-i', audio_file]
+            audio = ['-map', f"{len(cuts)}:a", '-c:a', 'aac']
+
+            captions, outputs = self._caption_outputs(
+                scripts, "[base]", audio, audio_duration, work_dir, subtitle_files
+            )
+            args += ['-filter_complex', ";".join(filters + captions)]
+            for output, output_path in zip(outputs, output_paths):
+                args += output + [output_path]
+
+            self._encode(args, audio_duration, len(scripts))
+            return list(output_paths)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def render_base(self, video_files, audio_file, output_path, cuts=None, crf=12):
+        """Render the captionless base (cuts plus voiceover) at near-lossless quality.
+
+        Captions can then be laid over it with overlay() without decoding
+        and scaling the source clips again.
+        """
+        audio_duration = self.planner.info(audio_file)['duration']
+        if cuts is None:
+            cuts = self.planner.plan(video_files, audio_duration)
+        if not cuts:
+            logger.error("No video clips available to create video")
+            return None
+
+        logger.info(f"Rendering base video from {len(cuts)} cuts with ffmpeg")
+        args, filters = self._base_graph(cuts)
+        args += [
+            '-i', audio_file,
+            '-filter_complex', ";".join(filters),
+            '-map', '[base]',
+            '-map', f"{len(cuts)}:a",
+            '-c:v', 'libx264',
+            '-preset', 'ultrafast',
+            '-crf', str(crf),
+            '-r', str(self.fps),
+            '-c:a', 'aac',
+            '-b:a', '192k',
+            '-t', f"{audio_duration:.3f}",
+            '-f', 'mp4',
+            output_path
+        ]
+        self._encode(args, audio_duration, 1)
+        return output_path
+
+    def overlay(self, scripts, base_path, output_paths, duration, subtitle_files=None):
+        """Caption and encode a base video once per script; the audio is copied as is"""
+        logger.info(f"Captioning base video {base_path} into {len(output_paths)} variant(s) with ffmpeg")
+        work_dir = tempfile.mkdtemp(prefix='render_')
+        try:
+            args = ['-i', base_path]
+            audio = ['-map', '0:a', '-c:a', 'copy']
+            captions, outputs = self._caption_outputs(scripts, "[0:v]", audio, duration, work_dir, subtitle_files)
+            args += ['-filter_complex', ";".join(captions)]
+            for output, output_path in zip(outputs, output_paths):
+                args += output + [output_path]
+
+            self._encode(args, duration, len(scripts))
+            return list(output_paths)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
@@ -1,113 +1,383 @@
 import os
 import json
 import random
+import threading
+import concurrent.futures
 import openai
 import sys
 sys.path.append('..')
 from utils.logger import setup_logger
-from utils.helpers import load_json, save_json
+from utils.helpers import load_json, save_json, cache_key
+from utils.response_cache import ResponseCache
+from utils.script_index import ScriptIndex
+from utils import metrics
 
 # Set up logger
 logger = setup_logger('idea_generator')
 
+SCRIPT_KEYS = ('hook', 'body', 'cta')
+
+TITLE_TEMPLATES = [
+    "How to {trend} for {category}",
+    "Why you should {trend} for {category}",
+    "The secret to {trend} for {category}",
+    "3 ways to {trend} for {category}",
+    "I tried {trend} for {category}"
+]
+
+def valid_script(script):
+    """Whether a model response element is a script with non-empty hook, body and cta"""
+    return isinstance(script, dict) and all(
+        isinstance(script.get(key), str) and script[key].strip() for key in SCRIPT_KEYS
+    )
+
 class IdeaGenerator:
-    def __init__(self, templates_dir='data/templates', trends_file='data/trends.json'):
+    def __init__(self, templates_dir='data/templates', trends_file='data/trends.json', config_file='config.json'):
         # Initialize OpenAI API
         openai.api_key = os.getenv("OPENAI_API_KEY")
-        
+        if os.getenv("OPENAI_API_BASE"):
+            openai.api_base = os.getenv("OPENAI_API_BASE")
+
+        # Load settings
+        config = load_json(config_file)
+        self.config = config.get('idea_settings', {})
+        self.model = self.config.get('model', 'gpt-4')
+        self.temperature = self.config.get('temperature', 0.7)
+        # Scripts asked for per completion in generate_multiple_ideas
+        self.batch_size = self.config.get('batch_size', 1)
+        self.batch_retries = self.config.get('batch_retries', 2)
+
+        # Optional prompt -> response cache
+        cache_dir = config.get('cache_settings', {}).get('cache_dir', 'assets/cache')
+        self.cache = None
+        if self.config.get('cache_enabled', False):
+            self.cache = ResponseCache(
+                cache_file=os.path.join(cache_dir, 'llm_responses.json'),
+                variants=self.config.get('cache_variants', 3),
+                ttl=self.config.get('cache_ttl', 604800)
+            )
+
+        # Identical prompts in flight share one request
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+
+        # Near-duplicate detection against recently generated scripts
+        dedup_config = config.get('dedup_settings', {})
+        self.script_index = None
+        if dedup_config.get('enabled', False):
+            self.script_index = ScriptIndex(
+                index_file=os.path.join(cache_dir, 'script_index.json'),
+                threshold=dedup_config.get('threshold', 0.5),
+                history_days=dedup_config.get('history_days', 30)
+            )
+        self.dedup_retries = dedup_config.get('regenerate', 2)
+
         # Load templates
         self.hook_templates = load_json(os.path.join(templates_dir, 'hook_templates.json'))
         self.body_templates = load_json(os.path.join(templates_dir, 'body_templates.json'))
         self.cta_templates = load_json(os.path.join(templates_dir, 'cta_templates.json'))
-        
+
         # Load data
         self.trends = load_json(trends_file)
         self.categories = load_json('data/categories/categories.json')
         self.audiences = load_json('data/categories/audiences.json')
-        
+
         logger.info("IdeaGenerator initialized")
-    
-    def generate_video_idea(self, category=None, audience=None, trend=None):
-        """Generate a complete video idea with script"""
+
+    def _request_script(self, prompt, max_tokens=500):
+        """Ask the model for a script and parse it"""
         try:
-            # Select random elements if not specified
-            category = category or random.choice(self.categories)
-            audience = audience or random.choice(self.audiences)
-            trend = trend or random.choice(self.trends)
-            
-            # Generate title
-            title_templates = [
-                "How to {trend} for {category}",
-                "Why you should {trend} for {category}",
-                "The secret to {trend} for {category}",
-                "3 ways to {trend} for {category}",
-                "I tried {trend} for {category}"
-            ]
-            title = random.choice(title_templates).format(
-                trend=trend.lower(),
-                category=category.lower()
-            )
-            
-            # Generate script sections using GPT-4
-            prompt = f"""
+            with metrics.stage_timer('idea'):
+                response = openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=self.temperature,
+                    max_tokens=max_tokens
+                )
+        except Exception as e:
+            metrics.provider_error('openai', getattr(e, 'http_status', None) or type(e).__name__)
+            raise
+
+        content = response.choices[0].message.content
+        return content, json.loads(content)
+
+    def _generate_script(self, prompt, max_tokens=500):
+        """Generate a script, going through the response cache when enabled.
+
+        Identical prompts already in flight are shared whether or not the
+        cache is on.
+        """
+        if self.cache:
+            key = self.cache.key(self.model, prompt, temperature=self.temperature)
+            cached = self.cache.get(key)
+            metrics.cache_lookup('llm', cached is not None)
+            if cached is not None:
+                logger.info("Using cached script response")
+                return json.loads(cached)
+        else:
+            key = cache_key(self.model, prompt, self.temperature)
+
+        with self.inflight_lock:
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self.inflight[key] = future
+
+        if not owner:
+            logger.info("Waiting for identical in-flight script request")
+            return json.loads(future.result())
+
+        try:
+            content, script = self._request_script(prompt, max_tokens)
+            if self.cache:
+                self.cache.add(key, content)
+            future.set_result(content)
+            return script
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.inflight_lock:
+                del self.inflight[key]
+
+    def _pick(self, category=None, audience=None, trend=None):
+        """Fill in a random category, audience and trend where not given"""
+        return (
+            category or random.choice(self.categories),
+            audience or random.choice(self.audiences),
+            trend or random.choice(self.trends)
+        )
+
+    def _script_prompt(self, category, audience, trend):
+        return f"""
             Create a TikTok script with three sections:
             1. A hook (max 15 words) about {trend} for {category} targeting {audience}
             2. A body section (max 100 words) explaining 3 key points about {trend}
             3. A call-to-action (max 20 words) encouraging engagement
-            
+
             Format as JSON with keys: "hook", "body", "cta"
             """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            script = json.loads(response.choices[0].message.content)
-            
-            # Generate hashtags
-            hashtags = [
-                f"#{category.replace(' ', '')}",
-                f"#{trend.replace(' ', '').replace('-', '')}",
-                "#TikTokTips",
-                f"#{audience.split()[0].replace('(', '').replace(')', '').replace('-', '')}",
-                "#viral",
-                "#trending"
-            ]
-            
-            # Create complete video idea
-            video_idea = {
-                "title": title,
-                "category": category,
-                "target_audience": audience,
-                "trend_type": trend,
-                "script": script,
-                "visual_elements": f"Show {trend.lower()} in action with text overlays highlighting key points",
-                "audio_suggestions": f"Upbeat background music suitable for {category.lower()} content",
-                "hashtags": hashtags
-            }
-            
-            logger.info(f"Generated video idea: {title}")
+
+    def _batch_prompt(self, specs):
+        topics = "\n".join(
+            f"            {n}. {trend} for {category} targeting {audience}"
+            for n, (category, audience, trend) in enumerate(specs, start=1)
+        )
+        return f"""
+            Create {len(specs)} TikTok scripts, one for each of these topics:
+{topics}
+
+            Each script has three sections:
+            1. A hook (max 15 words) about the topic
+            2. A body section (max 100 words) explaining 3 key points about the trend
+            3. A call-to-action (max 20 words) encouraging engagement
+
+            Return a JSON array of exactly {len(specs)} objects in the order of the topics,
+            each with keys: "hook", "body", "cta"
+            """
+
+    def _build_idea(self, category, audience, trend, script):
+        """Complete video idea around a generated script"""
+        # Generate title
+        title = random.choice(TITLE_TEMPLATES).format(
+            trend=trend.lower(),
+            category=category.lower()
+        )
+
+        # Generate hashtags
+        hashtags = [
+            f"#{category.replace(' ', '')}",
+            f"#{trend.replace(' ', '').replace('-', '')}",
+            "#TikTokTips",
+            f"#{audience.split()[0].replace('(', '').replace(')', '').replace('-', '')}",
+            "#viral",
+            "#trending"
+        ]
+
+        # Create complete video idea
+        return {
+            "title": title,
+            "category": category,
+            "target_audience": audience,
+            "trend_type": trend,
+            "script": script,
+            "visual_elements": f"Show {trend.lower()} in action with text overlays highlighting key points",
+            "audio_suggestions": f"Upbeat background music suitable for {category.lower()} content",
+            "hashtags": hashtags
+        }
+
+    def generate_video_idea(self, category=None, audience=None, trend=None):
+        """Generate a complete video idea with script"""
+        try:
+            category, audience, trend = self._pick(category, audience, trend)
+
+            # Generate script sections using GPT-4
+            script = self._generate_script(self._script_prompt(category, audience, trend))
+            if not valid_script(script):
+                raise ValueError(f"Malformed script response: {script}")
+
+            video_idea = self._build_idea(category, audience, trend, script)
+            logger.info(f"Generated video idea: {video_idea['title']}")
             return video_idea
-            
+
         except Exception as e:
             logger.error(f"Error generating video idea: {e}")
             return None
-    
-    def generate_multiple_ideas(self, count=10, output_file=None):
-        """Generate multiple video ideas"""
+
+    def _request_batch(self, specs):
+        """One completion for several scripts; returns a script or None per spec"""
+        try:
+            response = self._generate_script(
+                self._batch_prompt(specs),
+                max_tokens=min(4000, 250 * len(specs) + 100)
+            )
+        except Exception as e:
+            logger.error(f"Error generating batch of {len(specs)} scripts: {e}")
+            return [None] * len(specs)
+
+        # Accept an array wrapped in an object, e.g. {"scripts": [...]}
+        if isinstance(response, dict):
+            response = next((value for value in response.values() if isinstance(value, list)), [response])
+        if not isinstance(response, list):
+            return [None] * len(specs)
+        return [
+            response[index] if index < len(response) and valid_script(response[index]) else None
+            for index in range(len(specs))
+        ]
+
+    def generate_idea_batch(self, specs=None, count=None):
+        """Generate several video ideas from one completion.
+
+        `specs` are (category, audience, trend) tuples, random when omitted.
+        Scripts missing from the response or failing validation are asked
+        for again, in one smaller batch, up to `batch_retries` times.
+        Returns one idea or None per spec.
+        """
+        specs = [self._pick(*spec) for spec in specs] if specs else [self._pick() for _ in range(count or 1)]
+        scripts = [None] * len(specs)
+
+        pending = list(range(len(specs)))
+        for attempt in range(self.batch_retries + 1):
+            if attempt:
+                logger.info(f"Retrying {len(pending)} of {len(specs)} scripts (attempt {attempt + 1})")
+            results = self._request_batch([specs[index] for index in pending])
+            for index, script in zip(pending, results):
+                scripts[index] = script
+            pending = [index for index in pending if scripts[index] is None]
+            if not pending:
+                break
+
         ideas = []
-        
-        for i in range(count):
-            idea = self.generate_video_idea()
+        for spec, script in zip(specs, scripts):
+            if script is None:
+                ideas.append(None)
+                continue
+            idea = self._build_idea(*spec, script)
+            logger.info(f"Generated video idea: {idea['title']}")
+            ideas.append(idea)
+        return ideas
+
+    def generate_multiple_ideas(self, count=10, output_file=None, concurrency=None, batch_size=None, report=None):
+        """Generate multiple video ideas, optionally several at a time.
+
+        With a batch_size above 1 each completion returns that many scripts.
+        If `report` is a dict, it receives the `failed_ids` and
+        `duplicate_ids` of this call; nothing is kept on the instance, so
+        concurrent callers can share one generator.
+        """
+        concurrency = concurrency or self.config.get('concurrency', 1)
+        batch_size = batch_size or self.batch_size
+        results = self._generate_slots(list(range(1, count + 1)), concurrency, batch_size)
+
+        if self.script_index:
+            self._deduplicate(results, concurrency, batch_size)
+
+        # Ids follow the request slot, not completion order
+        ideas = []
+        failed_ids = []
+        for idea_id in sorted(results):
+            idea = results[idea_id]
             if idea:
-                idea['id'] = i + 1
+                idea['id'] = idea_id
                 ideas.append(idea)
-        
+            else:
+                failed_ids.append(idea_id)
+
+        if failed_ids:
+            logger.error(f"Failed to generate {len(failed_ids)} of {count} ideas: {failed_ids}")
+
+        duplicate_ids = [idea['id'] for idea in ideas if idea.get('duplicate_of')]
+        if duplicate_ids:
+            logger.warning(f"Flagged {len(duplicate_ids)} near-duplicate ideas: {duplicate_ids}")
+
+        if report is not None:
+            report.update(failed_ids=failed_ids, duplicate_ids=duplicate_ids)
+
         if output_file:
             save_json(ideas, output_file)
             logger.info(f"Saved {len(ideas)} ideas to {output_file}")
-        
-        return ideas
\ No newline at end of file
+
+        return ideas
+
+    def _generate_slots(self, slots, concurrency, batch_size):
+        """Generate one idea per slot and return {slot: idea or None}"""
+        results = {}
+        if batch_size > 1:
+            batches = [slots[i:i + batch_size] for i in range(0, len(slots), batch_size)]
+            logger.info(f"Generating {len(slots)} ideas in {len(batches)} batches with concurrency {concurrency}")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+                future_to_slots = {
+                    executor.submit(self.generate_idea_batch, count=len(batch)): batch for batch in batches
+                }
+                for future in concurrent.futures.as_completed(future_to_slots):
+                    results.update(zip(future_to_slots[future], future.result()))
+        elif concurrency <= 1:
+            for slot in slots:
+                results[slot] = self.generate_video_idea()
+        else:
+            logger.info(f"Generating {len(slots)} ideas with concurrency {concurrency}")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+                future_to_slot = {executor.submit(self.generate_video_idea): slot for slot in slots}
+                for future in concurrent.futures.as_completed(future_to_slot):
+                    results[future_to_slot[future]] = future.result()
+        return results
+
+    def _deduplicate(self, results, concurrency, batch_size):
+        """Regenerate ideas whose script nearly repeats an earlier one, in place.
+
+        Each script is checked against the scripts of recently produced
+        videos and this run's earlier ideas. Nothing is recorded here; the
+        index only learns a script once a video is made from it. Duplicates
+        are generated again up to `regenerate` times; those still left get a
+        `duplicate_of` entry naming the script they repeat.
+        """
+        pending = sorted(slot for slot, idea in results.items() if idea)
+        accepted = {}
+        for attempt in range(self.dedup_retries + 1):
+            duplicates = {}
+            for slot in pending:
+                idea = results[slot]
+                entry_id, entry = self.script_index.entry(idea['script'], title=idea['title'])
+                match = self.script_index.match(entry['signature'], batch=accepted)
+                if match:
+                    duplicates[slot] = match
+                else:
+                    accepted[entry_id] = entry
+
+            if not duplicates or attempt == self.dedup_retries:
+                break
+
+            logger.info(f"Regenerating {len(duplicates)} near-duplicate ideas (attempt {attempt + 1})")
+            fresh = self._generate_slots(list(duplicates), concurrency, batch_size)
+            for slot, idea in fresh.items():
+                if idea:
+                    results[slot] = idea
+            pending = list(duplicates)
+
+        for slot, (entry_id, entry, similarity) in duplicates.items():
+            results[slot]['duplicate_of'] = {
+                'script_id': entry_id,
+                'title': entry.get('title'),
+                'similarity': round(similarity, 2)
+            }
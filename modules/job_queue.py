@@ -0,0 +1,178 @@
+import time
+import uuid
+import threading
+import concurrent.futures
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import cache_key
+from utils import metrics
+
+# Set up logger
+logger = setup_logger('job_queue')
+
+STAGES = ('audio_file', 'video_files', 'video_path')
+
+class JobQueue:
+    """Background video jobs for the web app.
+
+    Jobs run on a bounded worker pool and expose per-stage progress. A
+    request identical to one still queued or running is attached to the
+    existing job instead of starting a new render. `on_produced`, if given,
+    is called with the script of every video a submitted job produces.
+    """
+
+    def __init__(self, pipeline, max_workers=2, job_ttl=3600, on_produced=None):
+        self.pipeline = pipeline
+        self.job_ttl = job_ttl
+        self.on_produced = on_produced
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='video-job')
+
+        self.lock = threading.Lock()
+        self.updated = threading.Condition(self.lock)
+        self.jobs = {}
+        self.inflight = {}
+        logger.info(f"JobQueue initialized with {max_workers} workers")
+
+    def submit(self, script, **options):
+        """Queue a video job; returns (job_id, deduplicated)"""
+        def produce(job_id, progress):
+            result = self.pipeline.produce(
+                script,
+                output_name=f"tiktok_{int(time.time())}_{job_id[:8]}.mp4",
+                progress=progress,
+                **options
+            )
+            if not result['error'] and self.on_produced:
+                try:
+                    self.on_produced(script)
+                except Exception as e:
+                    logger.warning(f"on_produced failed for job {job_id}: {e}")
+            return result
+
+        return self._submit(cache_key(script, options), produce, profile=options.get('profile') or 'final')
+
+    def promote(self, job_id, profile='final'):
+        """Queue a re-render of a finished job at `profile`; returns (job_id, deduplicated), or None"""
+        job = self.get(job_id)
+        if not job or job['status'] != 'done':
+            return None
+
+        video_path = job['video_path']
+        return self._submit(
+            cache_key('promote', video_path, profile),
+            lambda _, progress: self.pipeline.promote(video_path, profile=profile, progress=progress),
+            profile=profile,
+            promoted_from=job_id,
+            done_stages=('audio_file', 'video_files')
+        )
+
+    def recaption(self, job_id, script):
+        """Queue a caption-only re-render of a finished job; returns (job_id, deduplicated), or None.
+
+        `script` holds the hook, body and cta text to change; the footage and
+        voiceover of the original job are reused.
+        """
+        job = self.get(job_id)
+        if not job or job['status'] != 'done':
+            return None
+
+        video_path = job['video_path']
+        return self._submit(
+            cache_key('recaption', video_path, script),
+            lambda new_id, progress: self.pipeline.recaption(
+                video_path,
+                script,
+                output_name=f"tiktok_{int(time.time())}_{new_id[:8]}.mp4",
+                progress=progress
+            ),
+            profile=job['profile'],
+            recaptioned_from=job_id,
+            done_stages=('audio_file', 'video_files')
+        )
+
+    def _submit(self, key, task, profile, promoted_from=None, recaptioned_from=None, done_stages=()):
+        with self.lock:
+            self._prune()
+            if key in self.inflight:
+                return self.inflight[key], True
+
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {
+                'id': job_id,
+                'status': 'queued',
+                'stages': {stage: 'done' if stage in done_stages else 'pending' for stage in STAGES},
+                'progress': round(len(done_stages) / len(STAGES), 2),
+                'profile': profile,
+                'promoted_from': promoted_from,
+                'recaptioned_from': recaptioned_from,
+                'video_path': None,
+                'error': None,
+                'created_at': time.time(),
+                'finished_at': None,
+                'version': 0
+            }
+            self.inflight[key] = job_id
+            self._report_depth()
+
+        self.executor.submit(self._run, job_id, key, task)
+        return job_id, False
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job, stages=dict(job['stages'])) if job else None
+
+    def wait_for_update(self, job_id, version, timeout=15):
+        """Block until the job changes past `version` (or timeout) and return it"""
+        with self.updated:
+            self.updated.wait_for(
+                lambda: job_id not in self.jobs or self.jobs[job_id]['version'] != version,
+                timeout=timeout
+            )
+        return self.get(job_id)
+
+    def _update(self, job_id, **fields):
+        with self.updated:
+            job = self.jobs[job_id]
+            job.update(fields)
+            done = sum(1 for state in job['stages'].values() if state == 'done')
+            job['progress'] = round(done / len(STAGES), 2)
+            job['version'] += 1
+            self._report_depth()
+            self.updated.notify_all()
+
+    def _progress(self, job_id, stage, state):
+        with self.lock:
+            stages = dict(self.jobs[job_id]['stages'])
+        stages[stage] = state
+        self._update(job_id, stages=stages)
+
+    def _run(self, job_id, key, task):
+        try:
+            self._update(job_id, status='running')
+            result = task(job_id, lambda stage, state: self._progress(job_id, stage, state))
+            if result['error']:
+                self._update(job_id, status='failed', error=result['error'], finished_at=time.time())
+            else:
+                self._update(job_id, status='done', video_path=result['video_path'], finished_at=time.time())
+        except Exception as e:
+            logger.error(f"Error in video job {job_id}: {e}")
+            self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def _report_depth(self):
+        """Publish the number of queued jobs; call with the lock held"""
+        metrics.set_queue_depth('web_jobs', sum(1 for job in self.jobs.values() if job['status'] == 'queued'))
+
+    def _prune(self):
+        """Forget finished jobs older than job_ttl"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job['finished_at'] and now - job['finished_at'] > self.job_ttl
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
@@ -0,0 +1,113 @@
+import os
+import time
+import multiprocessing
+import concurrent.futures
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import load_json
+from utils import metrics
+from modules.video_editor import profile_output_name
+
+# Set up logger
+logger = setup_logger('render_pool')
+
+def _render_spec(spec):
+    """Worker process entry point: render one spec with a fresh VideoEditor"""
+    from modules.video_editor import VideoEditor
+    editor = VideoEditor(config_file=spec['config_file'])
+    return editor.create_video(
+        spec['script'],
+        spec['video_files'],
+        spec['audio_file'],
+        output_name=spec['output_name'],
+        profile=spec.get('profile')
+    )
+
+class RenderPool:
+    """Render videos in worker processes so moviepy compositing is not bound by the GIL.
+
+    A render spec is a plain dict (script, clip paths, audio path, output name
+    and config file), so it pickles cheaply across the process boundary.
+    """
+
+    def __init__(self, processes=None, config_file='config.json'):
+        self.config_file = config_file
+        self.output_dir = "assets/output"
+        self.processes = processes or load_json(config_file).get('video_settings', {}).get('render_processes') or os.cpu_count()
+
+        # spawn avoids forking a parent that may hold threads and open readers
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        self.pending = {}
+        logger.info(f"RenderPool initialized with {self.processes} processes")
+
+    def make_spec(self, script, video_files, audio_file, output_name=None, profile=None):
+        """Build a picklable render spec"""
+        if not output_name:
+            output_name = f"tiktok_{int(time.time())}.mp4"
+        return {
+            'script': script,
+            'video_files': list(video_files),
+            'audio_file': audio_file,
+            'output_name': output_name,
+            'profile': profile,
+            'config_file': self.config_file
+        }
+
+    def submit(self, spec):
+        """Queue a render and return its future"""
+        future = self.executor.submit(_render_spec, spec)
+        self.pending[future] = os.path.join(self.output_dir, profile_output_name(spec['output_name'], spec.get('profile')))
+        metrics.set_queue_depth('render_pool', len(self.pending))
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        self.pending.pop(future, None)
+        metrics.set_queue_depth('render_pool', len(self.pending))
+
+    def render(self, script, video_files, audio_file, output_name=None, profile=None):
+        """Render in a worker process and wait for the result"""
+        try:
+            # Timed here: metrics recorded inside the worker process stay there
+            with metrics.stage_timer('render'):
+                future = self.submit(self.make_spec(script, video_files, audio_file, output_name, profile))
+                output_path = future.result()
+            if not output_path:
+                metrics.stage_failed('render')
+            return output_path
+        except concurrent.futures.CancelledError:
+            logger.warning(f"Render cancelled: {output_name}")
+            return None
+        except Exception as e:
+            logger.error(f"Error in render worker: {e}")
+            return None
+
+    def shutdown(self, cancel=False):
+        """Stop the pool; with cancel=True, drop queued renders and kill running ones"""
+        if not cancel:
+            self.executor.shutdown(wait=True)
+            return
+
+        logger.info(f"Cancelling {len(self.pending)} renders")
+        unfinished = list(self.pending.items())
+        for future, _ in unfinished:
+            future.cancel()
+
+        # ProcessPoolExecutor has no public way to stop running tasks
+        processes = list((getattr(self.executor, '_processes', None) or {}).values())
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+        # Remove partially written outputs
+        for future, output_path in unfinished:
+            if not future.done() or future.cancelled() or future.exception() is not None:
+                if os.path.exists(output_path):
+                    os.remove(output_path)
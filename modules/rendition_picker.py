@@ -0,0 +1,111 @@
+import threading
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('rendition_picker')
+
+# Rough H.264 stock footage density, used only to compare renditions
+BITS_PER_PIXEL = 0.1
+
+class RenditionPicker:
+    """Pick the cheapest Pexels rendition that still covers the output frame.
+
+    A rendition "meets" the output if, once cover-scaled to width x height,
+    it does not need upscaling. Among those, the one with the smallest
+    estimated file size wins, preferring the output orientation and a frame
+    rate at or near the target. If none meets the output, the one closest
+    to it is used.
+
+    Savings are only counted for renditions actually downloaded: the real
+    size of the download is scaled by the estimated size ratio of the
+    rendition the selector used to take, so they remain an estimate.
+    """
+
+    def __init__(self, width=1080, height=1920, fps=30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+
+        self.lock = threading.Lock()
+        self.stats = {
+            'picked': 0,
+            'downloads': 0,
+            'downloaded_bytes': 0,
+            'estimated_baseline_bytes': 0,
+            'estimated_bytes_saved': 0
+        }
+
+    def estimate_bytes(self, video_file, duration):
+        fps = video_file.get('fps') or self.fps
+        return int(video_file['width'] * video_file['height'] * fps * duration * BITS_PER_PIXEL / 8)
+
+    def _score(self, video_file, duration):
+        """Sort key: lower is better"""
+        w, h = video_file['width'], video_file['height']
+        scale = max(self.width / w, self.height / h)
+        meets = scale <= 1.0
+        fps = video_file.get('fps') or self.fps
+        fps_penalty = 1 if fps < self.fps * 0.8 else 0
+        orientation_penalty = 0 if (h >= w) == (self.height >= self.width) else 1
+
+        if meets:
+            return (0, fps_penalty, self.estimate_bytes(video_file, duration), orientation_penalty)
+        # Nothing big enough: get as close to the output size as possible
+        return (1, scale, fps_penalty, self.estimate_bytes(video_file, duration))
+
+    def _baseline(self, candidates):
+        """The rendition the selector used to take: first HD file at least 720 wide"""
+        for video_file in candidates:
+            if video_file.get('quality') == 'hd' and video_file['width'] >= 720:
+                return video_file
+        return candidates[0]
+
+    def _candidates(self, video):
+        return [
+            f for f in video.get('video_files', [])
+            if f.get('width') and f.get('height') and f.get('link') and
+            f.get('file_type', 'video/mp4') == 'video/mp4'
+        ]
+
+    def pick(self, video):
+        """Return the best video_files entry of a Pexels video, or None"""
+        candidates = self._candidates(video)
+        if not candidates:
+            return None
+
+        duration = video.get('duration') or 10
+        best = min(candidates, key=lambda f: self._score(f, duration))
+
+        estimated = self.estimate_bytes(best, duration)
+        baseline = self.estimate_bytes(self._baseline(candidates), duration)
+        with self.lock:
+            self.stats['picked'] += 1
+
+        logger.info(
+            f"Picked {best['width']}x{best['height']}@{best.get('fps') or '?'} rendition "
+            f"of video {video.get('id')} (~{estimated / 1024 / 1024:.1f} MB, baseline ~{baseline / 1024 / 1024:.1f} MB)"
+        )
+        return best
+
+    def record_download(self, video, video_file, size):
+        """Count a downloaded rendition of `size` bytes against the baseline rendition"""
+        candidates = self._candidates(video)
+        if not candidates:
+            return
+
+        duration = video.get('duration') or 10
+        estimated = self.estimate_bytes(video_file, duration)
+        baseline = self.estimate_bytes(self._baseline(candidates), duration)
+        # Scale the real size by the estimated ratio; the baseline was never fetched
+        baseline_size = int(size * baseline / estimated) if estimated else size
+        with self.lock:
+            self.stats['downloads'] += 1
+            self.stats['downloaded_bytes'] += size
+            self.stats['estimated_baseline_bytes'] += baseline_size
+            self.stats['estimated_bytes_saved'] += baseline_size - size
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
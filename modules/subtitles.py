@@ -0,0 +1,180 @@
+import os
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import load_json
+from utils.media import escape_filter_value, caption_scale
+
+# Set up logger
+logger = setup_logger('subtitles')
+
+SECTIONS = ('hook', 'body', 'cta')
+
+def timing_path(audio_file):
+    """Word timing sidecar written next to a voiceover"""
+    return os.path.splitext(audio_file)[0] + '.timing.json'
+
+def load_timing(audio_file):
+    """Word timing of a voiceover, or None if it has no sidecar"""
+    path = timing_path(audio_file)
+    if not os.path.exists(path):
+        return None
+    return load_json(path) or None
+
+def words_from_alignment(alignment, offset=0.0):
+    """Word timings from an ElevenLabs character alignment"""
+    words = []
+    current, start, end = '', 0.0, 0.0
+    for char, char_start, char_end in zip(
+        alignment['characters'],
+        alignment['character_start_times_seconds'],
+        alignment['character_end_times_seconds']
+    ):
+        if char.isspace():
+            if current:
+                words.append({'word': current, 'start': round(offset + start, 3), 'end': round(offset + end, 3)})
+                current = ''
+            continue
+        if not current:
+            start = char_start
+        current += char
+        end = char_end
+    if current:
+        words.append({'word': current, 'start': round(offset + start, 3), 'end': round(offset + end, 3)})
+    return words
+
+def spread_words(text, start, end):
+    """Word timings spread over [start, end] in proportion to word length"""
+    words = text.split()
+    total = sum(len(word) + 1 for word in words)
+    timings = []
+    position = start
+    for word in words:
+        length = (end - start) * (len(word) + 1) / total
+        timings.append({'word': word, 'start': round(position, 3), 'end': round(position + length, 3)})
+        position += length
+    return timings
+
+def _proportional_sections(script, duration):
+    """Section spans over the whole duration, weighted by text length"""
+    lengths = [(section, len(script.get(section) or '')) for section in SECTIONS if script.get(section)]
+    total = sum(length for _, length in lengths) or 1
+    spans = {}
+    position = 0.0
+    for section, length in lengths:
+        span = duration * length / total
+        spans[section] = [position, position + span]
+        position += span
+    return spans
+
+def caption_events(script, timing, duration, max_words=4):
+    """(section, text, start, end) captions that follow the voiceover.
+
+    With a timing sidecar whose words match the script, every caption shows
+    while its words are spoken. Text that no longer matches the audio (an
+    edited caption) is spread over its section's span, and without any
+    timing the sections share the duration in proportion to their length.
+    """
+    spans = (timing or {}).get('sections') or _proportional_sections(script, duration)
+    timed_words = (timing or {}).get('words', [])
+
+    sections = [section for section in SECTIONS if script.get(section) and section in spans]
+    events = []
+    for index, section in enumerate(sections):
+        start, end = spans[section]
+        # The last section stays up until the video ends
+        if index == len(sections) - 1:
+            end = max(end, duration)
+
+        text = script[section]
+        words = [word for word in timed_words if word.get('section') == section]
+        if [word['word'] for word in words] != text.split():
+            words = spread_words(text, start, end)
+
+        chunks = [words[i:i + max_words] for i in range(0, len(words), max_words)]
+        for n, chunk in enumerate(chunks):
+            # Hold each caption until the next one so the text never blinks off
+            chunk_end = chunks[n + 1][0]['start'] if n + 1 < len(chunks) else end
+            chunk_start = start if n == 0 else chunk[0]['start']
+            if chunk_end > chunk_start:
+                events.append((section, ' '.join(word['word'] for word in chunk), chunk_start, chunk_end))
+    return events
+
+def _timestamp(seconds):
+    centiseconds = int(round(max(0.0, seconds) * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+def _escape_ass(text):
+    """Keep caption text from being read as ASS override tags"""
+    return text.replace('\\', '/').replace('{', '(').replace('}', ')').replace('\n', ' ')
+
+def subtitles_filter(path, fonts_dir=None):
+    """ffmpeg filter that burns in the subtitle track at path"""
+    options = [f"filename='{escape_filter_value(path)}'"]
+    if fonts_dir:
+        options.append(f"fontsdir='{escape_filter_value(fonts_dir)}'")
+    return "subtitles=" + ":".join(options)
+
+class SubtitleTrack:
+    """Build an ASS subtitle track for the captions of a script.
+
+    The styles match the overlay captions: a boxed white hook and a yellow
+    CTA in the centre, and white body text at the bottom, scaled from the
+    1080 wide layout. The track is burned in with ffmpeg's libass
+    `subtitles` filter in the same pass as the encode.
+    """
+
+    def __init__(self, width, height, font='Arial', max_words=4):
+        self.width = width
+        self.height = height
+        self.font = font
+        self.max_words = max_words
+        self.scale = caption_scale(width)
+
+    def _style(self, name, fontsize, colour, alignment, margin_v, box=False, bold=True):
+        size = lambda value: max(1, round(value * self.scale))
+        # BorderStyle 3 draws an opaque box in the outline colour, 1 a plain outline
+        border_style, outline = (3, size(20)) if box else (1, size(3))
+        return (
+            f"Style: {name},{self.font},{size(fontsize)},{colour},{colour},&H00000000,&H80000000,"
+            f"{-1 if bold else 0},0,0,0,100,100,0,0,{border_style},{outline},0,{alignment},"
+            f"{size(40)},{size(40)},{size(margin_v)},1"
+        )
+
+    def render(self, script, timing, duration):
+        """ASS document text for a script"""
+        lines = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {self.width}",
+            f"PlayResY: {self.height}",
+            "WrapStyle: 0",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, "
+            "Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+            # Colours are &HAABBGGRR; alignment 5 is the centre, 2 bottom centre
+            self._style('hook', 70, '&H00FFFFFF', 5, 0, box=True),
+            self._style('body', 50, '&H00FFFFFF', 2, 60, bold=False),
+            self._style('cta', 60, '&H0000FFFF', 5, 0),
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text"
+        ]
+        for section, text, start, end in caption_events(script, timing, duration, self.max_words):
+            lines.append(f"Dialogue: 0,{_timestamp(start)},{_timestamp(end)},{section},,0,0,0,,{_escape_ass(text)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, script, audio_file, duration, path):
+        """Write the track for a script voiced by audio_file and return its path"""
+        timing = load_timing(audio_file)
+        if not timing:
+            logger.info(f"No word timing for {audio_file}, spreading captions over {duration:.2f}s")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.render(script, timing, duration))
+        return path
@@ -1,107 +1,453 @@
 import os
 import sys
 import time
-import moviepy.editor as mp
-import numpy as np
+import shutil
+import tempfile
 sys.path.append('..')
 from utils.logger import setup_logger
-from utils.helpers import load_json
+from utils.helpers import load_json, save_json
+from utils.media import parse_resolution, ffmpeg_binary, has_filter, caption_scale
+from utils import metrics
+from modules.ffmpeg_renderer import FFmpegRenderer
+from modules.cut_planner import CutPlanner
+from utils.base_cache import BaseCache
+from modules.subtitles import SubtitleTrack, subtitles_filter
 
 # Set up logger
 logger = setup_logger('video_editor')
 
+def _moviepy():
+    """Import moviepy on first use; it pulls in numpy and imageio and is slow to load"""
+    import moviepy.editor as mp
+    return mp
+
+# Profile used when none is named; renders at plain video_settings
+DEFAULT_PROFILE = 'final'
+
+def profile_output_name(output_name, profile=None):
+    """File name a render gets: profiles other than "final" are appended to the name"""
+    if not profile or profile == DEFAULT_PROFILE:
+        return output_name
+    root, ext = os.path.splitext(output_name)
+    return f"{root}_{profile}{ext}"
+
 class VideoEditor:
     def __init__(self, config_file='config.json'):
-        self.config = load_json(config_file).get('video_settings', {})
+        config = load_json(config_file)
+        self.config = config.get('video_settings', {})
         self.output_dir = "assets/output"
         os.makedirs(self.output_dir, exist_ok=True)
+        
+        # Rendering engine: "moviepy" (default) or "ffmpeg"
+        self.engine = self.config.get('engine', 'moviepy')
+        
+        # Named render profiles layered over video_settings, e.g. a fast "draft"
+        self.profiles = config.get('render_profiles', {})
+        self.profiles.setdefault(DEFAULT_PROFILE, {})
+        
+        # Both engines render from the same metadata-driven cut list
+        cache_dir = config.get('cache_settings', {}).get('cache_dir', 'assets/cache')
+        self.planner = CutPlanner(cache_file=os.path.join(cache_dir, 'probe_cache.json'))
+        
+        # Captionless base videos, so a caption edit only re-runs overlay and encode
+        base_settings = config.get('base_cache_settings', {})
+        self.use_base_cache = base_settings.get('enabled', False)
+        self.base_crf = base_settings.get('crf', 12)
+        self.base_cache = BaseCache(
+            cache_dir=os.path.join(cache_dir, 'base'),
+            max_disk_mb=base_settings.get('max_disk_mb', 1024)
+        )
         logger.info("VideoEditor initialized")
     
-    def create_video(self, script, video_files, audio_file, output_name=None):
-        """Create final video with all elements"""
+    def profile_settings(self, profile=None):
+        """video_settings with a render profile applied"""
+        profile = profile or DEFAULT_PROFILE
+        if profile not in self.profiles:
+            raise ValueError(f"Unknown render profile: {profile}")
+        return dict(self.config, **self.profiles[profile])
+    
+    def manifest_path(self, video_path):
+        """Render manifest stored next to a rendered video"""
+        return os.path.splitext(video_path)[0] + '.json'
+    
+    def create_video(self, script, video_files, audio_file, output_name=None, profile=None, cuts=None):
+        """Create final video with all elements.
+        
+        Videos rendered with a profile other than "final" get the profile name
+        appended to output_name. `cuts`, if given, is a cut list to reuse
+        instead of planning one.
+        """
+        with metrics.stage_timer('render'):
+            output_path = self._create_videos([script], [output_name], video_files, audio_file, profile, cuts)[0]
+        if not output_path:
+            metrics.stage_failed('render')
+        return output_path
+    
+    def create_variants(self, script, variants, video_files, audio_file, output_name=None, profile=None, cuts=None):
+        """Render several caption variants of one video, decoding the footage once.
+        
+        Each variant is a dict overriding any of the script's hook, body and
+        cta, with an optional `name` (default v1, v2, ...) appended to
+        output_name. Returns the output paths in variant order, with None for
+        variants that failed.
+        """
+        if not output_name:
+            output_name = f"tiktok_{int(time.time())}.mp4"
+        root, ext = os.path.splitext(output_name)
+        
+        scripts = []
+        names = []
+        for index, variant in enumerate(variants):
+            variant = dict(variant)
+            name = variant.pop('name', None) or f"v{index + 1}"
+            scripts.append(dict(script, **variant))
+            names.append(f"{root}_{name}{ext}")
+        
+        with metrics.stage_timer('render'):
+            output_paths = self._create_videos(scripts, names, video_files, audio_file, profile, cuts)
+        if not all(output_paths):
+            metrics.stage_failed('render')
+        return output_paths
+    
+    def promote(self, video_path, profile=DEFAULT_PROFILE, output_name=None):
+        """Re-render a draft at another profile from its manifest; returns the new path or None"""
         try:
-            if not output_name:
-                timestamp = int(time.time())
-                output_name = f"tiktok_{timestamp}.mp4"
+            manifest = self._load_manifest(video_path)
+            if not manifest:
+                return None
             
-            output_path = os.path.join(self.output_dir, output_name)
+            logger.info(f"Promoting {video_path} to the {profile} profile")
+            return self.create_video(
+                manifest['script'],
+                manifest['video_files'],
+                manifest['audio_file'],
+                output_name=output_name or manifest['output_name'],
+                profile=profile,
+                cuts=manifest['cuts']
+            )
+        except Exception as e:
+            logger.error(f"Error promoting video {video_path}: {e}")
+            return None
+    
+    def recaption(self, video_path, script, output_name=None):
+        """Re-render a video with new caption text over its captionless base.
+        
+        `script` may override only some of hook, body and cta. With the base
+        cached only the caption overlay and encode run; otherwise the base is
+        first rebuilt from the manifest's cut list. The video is replaced
+        unless output_name is given. Returns the new path or None.
+        """
+        try:
+            manifest = self._load_manifest(video_path)
+            if not manifest:
+                return None
             
-            # Load audio
-            audio = mp.AudioFileClip(audio_file)
-            audio_duration = audio.duration
+            logger.info(f"Re-captioning {video_path}")
+            with metrics.stage_timer('render'):
+                output_path = self._create_videos(
+                    [dict(manifest['script'], **script)],
+                    [output_name or manifest['output_name']],
+                    manifest['video_files'],
+                    manifest['audio_file'],
+                    profile=manifest['profile'],
+                    cuts=manifest['cuts'],
+                    use_base=True
+                )[0]
+            if not output_path:
+                metrics.stage_failed('render')
+            return output_path
+        except Exception as e:
+            logger.error(f"Error re-captioning video {video_path}: {e}")
+            return None
+    
+    def _load_manifest(self, video_path):
+        """Render manifest of a video whose inputs still exist, or None"""
+        manifest_path = self.manifest_path(video_path)
+        if not os.path.exists(manifest_path):
+            logger.error(f"No render manifest for {video_path}")
+            return None
+        
+        manifest = load_json(manifest_path)
+        missing = [
+            path for path in [manifest['audio_file']] + [cut['file'] for cut in manifest['cuts']]
+            if not os.path.exists(path)
+        ]
+        if missing:
+            logger.error(f"Cannot re-render {video_path}, inputs are gone: {missing}")
+            return None
+        return manifest
+    
+    def base_video(self, cuts, audio_file, profile=None):
+        """Captionless base video for a cut list and voiceover, rendered on a cache miss"""
+        settings = self.profile_settings(profile)
+        key = self.base_cache.key(cuts, audio_file, settings)
+        
+        # Concurrent renders of the same base wait for the first one
+        with self.base_cache.lock_for(key):
+            base_path = self.base_cache.get(key)
+            metrics.cache_lookup('base', base_path is not None)
+            if base_path:
+                logger.info(f"Reusing cached base video {base_path}")
+                return base_path
+            
+            tmp_path = self.base_cache.tmp_path(key)
+            try:
+                if self.engine == 'ffmpeg':
+                    renderer = FFmpegRenderer(settings, planner=self.planner)
+                    renderer.render_base([], audio_file, tmp_path, cuts=cuts, crf=self.base_crf)
+                else:
+                    self._write_base_moviepy(cuts, audio_file, tmp_path, settings)
+                return self.base_cache.put(key, tmp_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    
+    def caption_engine(self, settings):
+        """Caption engine for settings; "subtitles" needs an ffmpeg build with libass"""
+        if settings.get('captions', 'overlay') != 'subtitles':
+            return 'overlay'
+        
+        if self.engine == 'ffmpeg':
+            binary = ffmpeg_binary()
+        else:
+            from moviepy.config import get_setting
+            binary = get_setting('FFMPEG_BINARY')
+        if has_filter('subtitles', binary):
+            return 'subtitles'
+        logger.warning(f"{binary} has no subtitles filter (libass), falling back to overlay captions")
+        return 'overlay'
+    
+    def _subtitle_files(self, scripts, audio_file, duration, settings, work_dir):
+        """Write one ASS caption track per script, timed to the voiceover"""
+        width, height = parse_resolution(settings.get('resolution', '1080x1920'))
+        font_file = settings.get('font_file')
+        track = SubtitleTrack(
+            width, height,
+            font=os.path.splitext(os.path.basename(font_file))[0] if font_file else 'Arial',
+            max_words=settings.get('caption_words', 4)
+        )
+        return [
+            track.write(script, audio_file, duration, os.path.join(work_dir, f"captions_{index}.ass"))
+            for index, script in enumerate(scripts)
+        ]
+    
+    def _create_videos(self, scripts, output_names, video_files, audio_file, profile=None, cuts=None, use_base=None):
+        """Render one video per script over the same cuts and audio; returns paths or Nones.
+        
+        With `use_base` (base_cache_settings.enabled by default) the captions
+        are laid over the cached captionless base instead of the source clips.
+        """
+        if use_base is None:
+            use_base = self.use_base_cache
+        work_dir = tempfile.mkdtemp(prefix='captions_')
+        try:
+            profile = profile or DEFAULT_PROFILE
+            settings = self.profile_settings(profile)
+            
+            timestamp = int(time.time())
+            output_names = [name or f"tiktok_{timestamp}.mp4" for name in output_names]
+            output_paths = [
+                os.path.join(self.output_dir, profile_output_name(name, profile)) for name in output_names
+            ]
             
-            logger.info(f"Creating video with {len(video_files)} clips and audio duration {audio_duration}s")
+            # Plan the cuts from probed metadata before opening any clip
+            start = time.time()
+            audio_duration = self.planner.info(audio_file)['duration']
+            if cuts is None:
+                cuts = self.planner.plan(video_files, audio_duration)
+            if not cuts:
+                logger.error("No video clips available to create video")
+                return [None] * len(scripts)
             
-            # Create clips from video files
-            clips = []
-            remaining_duration = audio_duration
+            logger.info(
+                f"Creating {len(scripts)} {profile} video(s) with {len(cuts)} of {len(video_files)} clips "
+                f"and audio duration {audio_duration}s"
+            )
             
-            for video_file in video_files:
-                if remaining_duration <= 0:
-                    break
-                    
-                video = mp.VideoFileClip(video_file)
-                
-                # Ensure vertical orientation (9:16 aspect ratio)
-                if video.w > video.h:
-                    video = video.resize(height=1920)
-                    video = video.crop(x_center=video.w/2, width=1080, height=1920)
+            # Subtitle tracks are burned in by ffmpeg during the encode
+            captions = self.caption_engine(settings)
+            subtitle_files = None
+            if captions == 'subtitles':
+                subtitle_files = self._subtitle_files(scripts, audio_file, audio_duration, settings, work_dir)
+            
+            base_path = self.base_video(cuts, audio_file, profile) if use_base else None
+            if self.engine == 'ffmpeg':
+                renderer = FFmpegRenderer(settings, planner=self.planner)
+                if base_path:
+                    output_paths = renderer.overlay(scripts, base_path, output_paths, audio_duration, subtitle_files)
                 else:
-                    video = video.resize(width=1080)
-                    
-                # Determine clip duration
-                clip_duration = min(video.duration, remaining_duration)
-                video = video.subclip(0, clip_duration)
-                
-                # Skip effects for now
-                # video = self._add_effects(video)
-                
-                clips.append(video)
-                remaining_duration -= clip_duration
+                    output_paths = renderer.render_variants(
+                        scripts, video_files, audio_file, output_paths, cuts, subtitle_files
+                    )
+            elif base_path:
+                output_paths = self._caption_moviepy(scripts, base_path, output_paths, settings, subtitle_files)
+            else:
+                output_paths = self._render_moviepy(scripts, cuts, audio_file, output_paths, settings, subtitle_files)
             
-            # If we don't have enough video content, loop the last clip
-            if remaining_duration > 0 and clips:
-                last_clip = clips[-1]
-                loops_needed = int(np.ceil(remaining_duration / last_clip.duration))
-                
-                for _ in range(loops_needed):
-                    if remaining_duration <= 0:
-                        break
-                    
-                    clip_duration = min(last_clip.duration, remaining_duration)
-                    looped_clip = last_clip.subclip(0, clip_duration)
-                    clips.append(looped_clip)
-                    remaining_duration -= clip_duration
-            
-            # Concatenate clips
-            if clips:
-                final_video = mp.concatenate_videoclips(clips)
-                
-                # Add audio
-                final_video = final_video.set_audio(audio)
+            render_seconds = round(time.time() - start, 3)
+            for script, output_name, output_path in zip(scripts, output_names, output_paths):
+                if not output_path:
+                    continue
+                save_json({
+                    'output': output_path,
+                    'output_name': output_name,
+                    'profile': profile,
+                    'engine': self.engine,
+                    'settings': {key: settings.get(key) for key in ('resolution', 'fps', 'bitrate', 'preset')},
+                    'script': script,
+                    'audio_file': audio_file,
+                    'video_files': list(video_files),
+                    'audio_duration': audio_duration,
+                    'cuts': cuts,
+                    'base': base_path,
+                    'captions': captions,
+                    'render_seconds': render_seconds,
+                    'created_at': time.time()
+                }, self.manifest_path(output_path))
+                logger.info(f"Video created successfully: {output_path}")
+            return output_paths
                 
+        except Exception as e:
+            logger.error(f"Error creating video: {e}")
+            return [None] * len(scripts)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    def _compose_moviepy(self, mp, cuts, width, height, readers):
+        """Concatenate a cut list at the output size; opened clips are added to readers"""
+        clips = []
+        for cut in cuts:
+            # The voiceover replaces the clip's own sound, so skip its audio reader
+            video = mp.VideoFileClip(cut['file'], audio=False)
+            readers.append(video)
+            
+            # Ensure vertical orientation (9:16 aspect ratio)
+            if (video.w, video.h) == (width, height):
+                # Already normalized on ingest
+                pass
+            elif video.w > video.h:
+                video = video.resize(height=height)
+                video = video.crop(x_center=video.w/2, width=width, height=height)
+            else:
+                video = video.resize(width=width)
+            
+            video = video.subclip(cut['in'], min(cut['out'], video.duration))
+            if cut['loops'] > 1:
+                video = video.fx(mp.vfx.loop, duration=cut['duration'])
+            
+            # Skip effects for now
+            # video = self._add_effects(video)
+            
+            clips.append(video)
+        
+        return mp.concatenate_videoclips(clips)
+    
+    def _render_moviepy(self, scripts, cuts, audio_file, output_paths, settings, subtitle_files=None):
+        """Composite and encode a cut list with moviepy, once per script.
+        
+        With several scripts the composed footage is written once to an
+        intermediate and every variant is captioned from that, instead of
+        decoding and scaling the source clips again.
+        """
+        if len(scripts) > 1:
+            work_dir = tempfile.mkdtemp(prefix='render_')
+            try:
+                base_path = self._write_base_moviepy(cuts, audio_file, os.path.join(work_dir, 'base.mp4'), settings)
+                return self._caption_moviepy(scripts, base_path, output_paths, settings, subtitle_files)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        
+        mp = _moviepy()
+        width, height = parse_resolution(settings.get('resolution', '1080x1920'))
+        
+        # Every reader opened here is closed once the video is written
+        readers = []
+        try:
+            audio = mp.AudioFileClip(audio_file)
+            readers.append(audio)
+            
+            # Add audio
+            base = self._compose_moviepy(mp, cuts, width, height, readers).set_audio(audio)
+            return self._write_captioned(mp, base, scripts, output_paths, settings, subtitle_files)
+        finally:
+            for reader in readers:
+                reader.close()
+    
+    def _write_base_moviepy(self, cuts, audio_file, output_path, settings):
+        """Write the captionless cuts plus voiceover at near-lossless quality"""
+        mp = _moviepy()
+        width, height = parse_resolution(settings.get('resolution', '1080x1920'))
+        
+        readers = []
+        try:
+            audio = mp.AudioFileClip(audio_file)
+            readers.append(audio)
+            
+            base = self._compose_moviepy(mp, cuts, width, height, readers).set_audio(audio)
+            logger.info(f"Writing base video to {output_path}")
+            base.write_videofile(
+                output_path,
+                codec="libx264",
+                audio_codec="aac",
+                audio_bitrate="192k",
+                fps=settings.get('fps', 30),
+                preset='ultrafast',
+                ffmpeg_params=['-crf', str(self.base_crf)],
+                logger=None
+            )
+            return output_path
+        finally:
+            for reader in readers:
+                reader.close()
+    
+    def _caption_moviepy(self, scripts, base_path, output_paths, settings, subtitle_files=None):
+        """Caption and encode a base video file once per script"""
+        mp = _moviepy()
+        base = mp.VideoFileClip(base_path)
+        try:
+            return self._write_captioned(mp, base, scripts, output_paths, settings, subtitle_files)
+        finally:
+            base.close()
+    
+    def _write_captioned(self, mp, base, scripts, output_paths, settings, subtitle_files=None):
+        """Caption and encode a composed clip once per script; failed outputs are None.
+        
+        With `subtitle_files` the tracks are burned in by the encoder's ffmpeg
+        instead of compositing TextClips frame by frame.
+        """
+        fps = settings.get('fps', 30)
+        output_paths = list(output_paths)
+        for index, (script, output_path) in enumerate(zip(scripts, output_paths)):
+            try:
                 # Add captions
-                final_video = self._add_captions(final_video, script)
+                ffmpeg_params = None
+                if subtitle_files:
+                    final_video = base
+                    font_file = settings.get('font_file')
+                    ffmpeg_params = ['-vf', subtitles_filter(
+                        subtitle_files[index], os.path.dirname(font_file) if font_file else None
+                    )]
+                else:
+                    final_video = self._add_captions(base, script)
                 
                 # Write final video
                 logger.info(f"Writing video to {output_path}")
-                final_video.write_videofile(
-                    output_path,
-                    codec="libx264",
-                    audio_codec="aac",
-                    fps=self.config.get('fps', 30),
-                    bitrate=self.config.get('bitrate', "8000k")
-                )
-                
-                logger.info(f"Video created successfully: {output_path}")
-                return output_path
-            else:
-                logger.error("No video clips available to create video")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error creating video: {e}")
-            return None
+                start = time.perf_counter()
+                with metrics.stage_timer('encode'):
+                    final_video.write_videofile(
+                        output_path,
+                        codec="libx264",
+                        audio_codec="aac",
+                        fps=fps,
+                        bitrate=settings.get('bitrate', "8000k"),
+                        preset=settings.get('preset', 'medium'),
+                        ffmpeg_params=ffmpeg_params
+                    )
+                metrics.record_render('moviepy', final_video.duration * fps, time.perf_counter() - start)
+            except Exception as e:
+                logger.error(f"Error writing video {output_path}: {e}")
+                output_paths[index] = None
+        return output_paths
     
     def _add_effects(self, clip):
         """Add visual effects to video clip"""
@@ -111,34 +457,37 @@ class VideoEditor:
     def _add_captions(self, video, script):
         """Add captions to video"""
         try:
+            mp = _moviepy()
+            scale = caption_scale(video.w)
+            
             # Hook caption (first 3 seconds)
             hook_txt_clip = mp.TextClip(
                 script['hook'],
-                fontsize=70,
+                fontsize=round(70 * scale),
                 color='white',
                 bg_color='black',
                 font='Arial-Bold',
-                size=(video.w - 40, None),
+                size=(round(video.w - 40 * scale), None),
                 method='caption'
             ).set_position(('center', 'center')).set_duration(3)
             
             # Body captions (middle section)
             body_txt_clip = mp.TextClip(
                 script['body'][:100] + "...",
-                fontsize=50,
+                fontsize=round(50 * scale),
                 color='white',
                 font='Arial',
-                size=(video.w - 80, None),
+                size=(round(video.w - 80 * scale), None),
                 method='caption'
             ).set_position(('center', 'bottom')).set_start(3).set_duration(video.duration - 13)
             
             # CTA caption (last 10 seconds)
             cta_txt_clip = mp.TextClip(
                 script['cta'],
-                fontsize=60,
+                fontsize=round(60 * scale),
                 color='yellow',
                 font='Arial-Bold',
-                size=(video.w - 40, None),
+                size=(round(video.w - 40 * scale), None),
                 method='caption'
             ).set_position(('center', 'center')).set_start(video.duration - 10).set_duration(10)
             
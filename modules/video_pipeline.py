@@ -0,0 +1,111 @@
+import time
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.task_graph import TaskGraph
+
+# Set up logger
+logger = setup_logger('video_pipeline')
+
+class VideoPipeline:
+    """Produce one video from a script.
+
+    Voiceover and clip selection only depend on the script, so they run
+    concurrently; the render starts as soon as both are ready.
+    """
+
+    def __init__(self, voice_gen, video_sel, video_ed, render=None):
+        self.voice_gen = voice_gen
+        self.video_sel = video_sel
+        self.video_ed = video_ed
+        self.render = render or video_ed.create_video
+
+    def _tracked(self, stage, func, progress):
+        """Wrap a task so progress(stage, state) is called as it starts and ends"""
+        if not progress:
+            return func
+
+        def run(inputs):
+            progress(stage, 'running')
+            try:
+                result = func(inputs)
+            except Exception:
+                progress(stage, 'failed')
+                raise
+            progress(stage, 'done' if result else 'failed')
+            return result
+        return run
+
+    def produce(self, script, output_name=None, progress=None, profile=None):
+        """Run the task graph and return a dict with the artifacts and any error.
+
+        `progress`, if given, is called as progress(stage, state) with stage one
+        of audio_file/video_files/video_path and state running/done/failed.
+        `profile` names the render profile, "final" by default.
+        """
+        if not output_name:
+            output_name = f"tiktok_{int(time.time())}.mp4"
+
+        graph = TaskGraph()
+        graph.add('audio_file', self._tracked(
+            'audio_file', lambda _: self.voice_gen.generate_from_script(script), progress
+        ))
+        graph.add('video_files', self._tracked(
+            'video_files', lambda _: self.video_sel.select_videos_for_script(script), progress
+        ))
+        graph.add('video_path', self._tracked(
+            'video_path',
+            lambda inputs: self.render(
+                script, inputs['video_files'], inputs['audio_file'], output_name=output_name, profile=profile
+            ),
+            progress
+        ), deps=('audio_file', 'video_files'))
+
+        results, errors = graph.run()
+        # The render is over (or never ran), so the clips may be evicted again
+        self.video_sel.release_clips(results.get('video_files'))
+
+        result = {
+            'audio_file': results.get('audio_file'),
+            'video_files': results.get('video_files'),
+            'video_path': results.get('video_path'),
+            'error': None
+        }
+        if 'audio_file' in errors:
+            result['error'] = 'Failed to generate voiceover'
+        elif 'video_files' in errors:
+            result['error'] = 'Failed to select video clips'
+        elif 'video_path' in errors:
+            result['error'] = 'Failed to create video'
+
+        if result['error']:
+            logger.error(f"{result['error']} for {output_name}")
+        return result
+
+    def promote(self, video_path, profile='final', progress=None):
+        """Re-render a finished preview at `profile`, reusing its audio, clips and cut list"""
+        return self._rerender(
+            lambda: self.video_ed.promote(video_path, profile=profile),
+            video_path, 'Failed to promote video', progress
+        )
+
+    def recaption(self, video_path, script, output_name=None, progress=None):
+        """Re-render a finished video with new caption text over its cached base footage"""
+        return self._rerender(
+            lambda: self.video_ed.recaption(video_path, script, output_name=output_name),
+            video_path, 'Failed to re-caption video', progress
+        )
+
+    def _rerender(self, render, video_path, error, progress):
+        """Run a render-only job; voiceover and clips come from the earlier video"""
+        if progress:
+            progress('video_path', 'running')
+        rendered = render()
+        if progress:
+            progress('video_path', 'done' if rendered else 'failed')
+
+        result = {'audio_file': None, 'video_files': None, 'video_path': rendered, 'error': None}
+        if not rendered:
+            result['error'] = error
+            logger.error(f"{result['error']} {video_path}")
+        return result
@@ -1,35 +1,104 @@
 import os
-import requests
 import time
+import threading
 import sys
 sys.path.append('..')
 from utils.logger import setup_logger
-from utils.helpers import extract_keywords
+from utils.http_client import get_client
+from utils.downloader import Downloader
+from utils.helpers import load_json, extract_keywords
+from utils.clip_cache import ClipCache
+from utils.clip_library import ClipLibrary
+from modules.clip_normalizer import ClipNormalizer
+from modules.rendition_picker import RenditionPicker
+from utils.media import parse_resolution
+from utils import metrics
 
 # Set up logger
 logger = setup_logger('video_selector')
 
 class VideoSelector:
-    def __init__(self):
+    def __init__(self, config_file='config.json'):
         self.pexels_api_key = os.getenv("PEXELS_API_KEY")
         self.pixabay_api_key = os.getenv("PIXABAY_API_KEY")
+        self.pexels_api_base = os.getenv("PEXELS_API_BASE", "https://api.pexels.com").rstrip('/')
+        self.http = get_client(config_file)
         self.output_dir = "assets/video"
         os.makedirs(self.output_dir, exist_ok=True)
+        
+        # Persistent search/clip cache
+        config = load_json(config_file)
+        cache_config = config.get('cache_settings', {})
+        self.cache = ClipCache(
+            cache_dir=cache_config.get('cache_dir', 'assets/cache'),
+            clip_dir=self.output_dir,
+            search_ttl=cache_config.get('search_ttl', 86400),
+            max_disk_mb=cache_config.get('max_disk_mb', 2048)
+        )
+        # Selected path -> [video id, rendition, pin count] of the cached clip behind it
+        self.pinned = {}
+        self.pinned_lock = threading.Lock()
+        
+        # Segmented, resumable downloads
+        download_config = config.get('download_settings', {})
+        self.downloader = Downloader(
+            self.http,
+            segments=download_config.get('segments', 4),
+            min_segment_mb=download_config.get('min_segment_mb', 8),
+            buffer_kb=download_config.get('buffer_kb', 1024)
+        )
+        
+        # Pick renditions by closeness to the output resolution
+        video_config = config.get('video_settings', {})
+        width, height = parse_resolution(video_config.get('resolution', '1080x1920'))
+        self.rendition_picker = RenditionPicker(width, height, video_config.get('fps', 30))
+        
+        # Optional one-off transcode of clips to the output format
+        self.normalizer = None
+        if video_config.get('normalize_on_ingest', False):
+            self.normalizer = ClipNormalizer(
+                video_config,
+                index_file=os.path.join(cache_config.get('cache_dir', 'assets/cache'), 'normalized_clips.json')
+            )
+            self.cache.on_evict = self.normalizer.forget
+        
+        # Index of clips already on disk, checked before searching Pexels
+        self.library = None
+        library_config = config.get('library_settings', {})
+        if library_config.get('enabled', True):
+            self.library = ClipLibrary(
+                clip_dir=self.output_dir,
+                index_file=os.path.join(cache_config.get('cache_dir', 'assets/cache'), 'clip_library.json'),
+                width=width,
+                height=height,
+                max_upscale=library_config.get('max_upscale', 1.5)
+            )
+            if library_config.get('refresh_on_start', True):
+                self.library.refresh()
         logger.info("VideoSelector initialized")
     
     def search_pexels(self, keyword, orientation="portrait", per_page=1):
         """Search Pexels API for videos"""
         try:
+            cached = self.cache.get_search(keyword, orientation, per_page)
+            metrics.cache_lookup('search', cached is not None)
+            if cached is not None:
+                logger.info(f"Using cached Pexels results for: {keyword}")
+                return cached
+            
             headers = {"Authorization": self.pexels_api_key}
-            url = f"https://api.pexels.com/videos/search?query={keyword}&orientation={orientation}&per_page={per_page}"
+            url = f"{self.pexels_api_base}/videos/search?query={keyword}&orientation={orientation}&per_page={per_page}"
             
             logger.info(f"Searching Pexels for: {keyword}") 
-            response = requests.get(url, headers=headers)
+            with metrics.stage_timer('search'):
+                response = self.http.get(url, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
-                if "videos" in data and len(data["videos"]) > 0:
-                    return data["videos"]
+                videos = data.get("videos", [])
+                self.cache.put_search(keyword, orientation, per_page, videos)
+                if len(videos) > 0:
+                    return videos
                 else:
                     logger.warning(f"No videos found for keyword: {keyword}")
                     return []
@@ -41,33 +110,114 @@ class VideoSelector:
             logger.error(f"Exception in search_pexels: {e}")
             return []
     
-    def download_video(self, video_url, keyword):
+    def download_video(self, video_url, keyword, local_path=None):
         """Download video from URL"""
         try:
-            timestamp = int(time.time())
-            local_path = os.path.join(self.output_dir, f"{keyword}_{timestamp}.mp4")
+            if not local_path:
+                timestamp = int(time.time())
+                local_path = os.path.join(self.output_dir, f"{keyword}_{timestamp}.mp4")
             
             logger.info(f"Downloading video: {video_url}")
-            response = requests.get(video_url, stream=True)
+            self.downloader.download(video_url, local_path)
             
-            if response.status_code == 200:
-                with open(local_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=1024):
-                        if chunk:
-                            f.write(chunk)
-                
-                logger.info(f"Video saved to {local_path}")
-                return local_path
-            else:
-                logger.error(f"Error downloading video: {response.status_code}")
-                return None
+            logger.info(f"Video saved to {local_path}")
+            return local_path
                 
         except Exception as e:
             logger.error(f"Exception in download_video: {e}")
             return None
     
+    def fetch_clip(self, video, video_file, keyword):
+        """Return a local copy of a Pexels rendition, downloading it only on a cache miss"""
+        rendition = video_file.get("id") or f"{video_file.get('quality')}_{video_file.get('width')}x{video_file.get('height')}"
+        
+        with self.cache.lock_for(video["id"], rendition):
+            # Pinned so eviction cannot remove it before the render is done
+            local_path = self.cache.get_clip(video["id"], rendition, pin=True)
+            metrics.cache_lookup('clip', local_path is not None)
+            if local_path:
+                logger.info(f"Using cached clip for {keyword}: {local_path}")
+            else:
+                local_path = self.download_video(
+                    video_file["link"],
+                    keyword,
+                    local_path=self.cache.clip_path(video["id"], rendition)
+                )
+                if not local_path:
+                    return None
+                self.cache.put_clip(video["id"], rendition, local_path, pin=True)
+                # The downloader checked the file against its Content-Length
+                self.rendition_picker.record_download(video, video_file, os.path.getsize(local_path))
+            
+            try:
+                if self.library:
+                    self.library.add(local_path, tags=[keyword], pexels_id=video["id"], rendition=rendition, url=video.get("url"))
+                
+                if self.normalizer:
+                    normalized_path = self.normalizer.ingest(local_path)
+                    if normalized_path != local_path:
+                        self.cache.attach(video["id"], rendition, normalized_path)
+                    local_path = normalized_path
+            except Exception:
+                self.cache.unpin(video["id"], rendition)
+                raise
+            
+            self._track_pin(local_path, video["id"], rendition)
+            return local_path
+    
+    def _track_pin(self, path, video_id, rendition):
+        with self.pinned_lock:
+            entry = self.pinned.setdefault(path, [video_id, rendition, 0])
+            entry[2] += 1
+    
+    def release_clips(self, video_files):
+        """Unpin the cached clips behind paths returned by select_videos_for_script"""
+        for path in video_files or []:
+            with self.pinned_lock:
+                entry = self.pinned.get(path)
+                if not entry:
+                    continue
+                entry[2] -= 1
+                if not entry[2]:
+                    del self.pinned[path]
+            self.cache.unpin(entry[0], entry[1])
+    
+    def library_clip(self, keyword, used):
+        """Return a suitable library clip whose source is not in `used` (and add it), or None"""
+        if not self.library:
+            return None
+        
+        match = self.library.query(keyword, exclude=used)
+        metrics.cache_lookup('library', match is not None)
+        if not match:
+            return None
+        
+        local_path, entry = match
+        used.add(local_path)
+        # Keep the clip cache's LRU order in step with library use
+        cached = bool(entry.get('pexels_id') and entry.get('rendition')) and \
+            self.cache.touch(entry['pexels_id'], entry['rendition'], pin=True)
+        logger.info(f"Using library clip for {keyword}: {local_path}")
+        
+        try:
+            if self.normalizer:
+                local_path = self.normalizer.ingest(local_path)
+        except Exception:
+            if cached:
+                self.cache.unpin(entry['pexels_id'], entry['rendition'])
+            raise
+        
+        if cached:
+            self._track_pin(local_path, entry['pexels_id'], entry['rendition'])
+        return local_path
+    
     def select_videos_for_script(self, script, num_videos=3):
-        """Select videos based on script content"""
+        """Select videos based on script content.
+        
+        Cached clips stay pinned until release_clips() is called with the
+        returned paths, once the render that uses them has finished.
+        """
+        video_files = []
         try:
             # Extract text from script
             text = f"{script['hook']} {script['body']} {script['cta']}"
@@ -76,27 +226,24 @@ class VideoSelector:
             keywords = extract_keywords(text, max_keywords=num_videos)
             logger.info(f"Extracted keywords: {keywords}")
             
-            video_files = []
+            used = set()
             
             for keyword in keywords:
+                local_path = self.library_clip(keyword, used)
+                if local_path:
+                    video_files.append(local_path)
+                    continue
+                
                 videos = self.search_pexels(keyword)
                 
                 if videos:
                     video = videos[0]  # Get first result
-                    video_url = None
-                    
-                    # Find HD or SD video file
-                    for video_file in video["video_files"]:
-                        if video_file["quality"] == "hd" and video_file["width"] >= 720:
-                            video_url = video_file["link"]
-                            break
-                    
-                    if not video_url and len(video["video_files"]) > 0:
-                        video_url = video["video_files"][0]["link"]
+                    selected_file = self.rendition_picker.pick(video)
                     
-                    if video_url:
-                        local_path = self.download_video(video_url, keyword)
+                    if selected_file:
+                        local_path = self.fetch_clip(video, selected_file, keyword)
                         if local_path:
+                            used.add(local_path)
                             video_files.append(local_path)
             
             logger.info(f"Selected {len(video_files)} videos for script")
@@ -104,4 +251,5 @@ class VideoSelector:
             
         except Exception as e:
             logger.error(f"Error selecting videos for script: {e}")
+            self.release_clips(video_files)
             return []
@@ -1,10 +1,16 @@
 import os
-import requests
 import time
+import base64
+import threading
+import concurrent.futures
 import sys
 sys.path.append('..')
 from utils.logger import setup_logger
-from utils.helpers import load_json
+from utils.http_client import get_client
+from utils.helpers import load_json, save_json, split_sentences, cache_key
+from utils.media import probe
+from utils import metrics
+from modules.subtitles import timing_path, words_from_alignment, spread_words
 
 # Set up logger
 logger = setup_logger('voice_generator')
@@ -12,58 +18,231 @@ logger = setup_logger('voice_generator')
 class VoiceGenerator:
     def __init__(self, config_file='config.json'):
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
-        self.config = load_json(config_file).get('voice_settings', {})
+        self.api_base = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io").rstrip('/')
+        config = load_json(config_file)
+        self.config = config.get('voice_settings', {})
+        self.model_id = self.config.get('model_id', 'eleven_monolingual_v1')
+        self.max_workers = self.config.get('tts_workers', 4)
+        # Ask for character timestamps so captions can follow the voiceover
+        self.timestamps = self.config.get('timestamps', True)
+        self.http = get_client(config_file)
         self.output_dir = "assets/audio"
         os.makedirs(self.output_dir, exist_ok=True)
+
+        # Sentence-level TTS cache
+        self.cache_dir = os.path.join(config.get('cache_settings', {}).get('cache_dir', 'assets/cache'), 'tts')
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Sentences being synthesized right now, so concurrent misses wait
+        # for the first request instead of paying for the same audio twice
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
         logger.info("VoiceGenerator initialized")
-    
+
+    def _voice_settings(self):
+        return {
+            "stability": self.config.get('stability', 0.75),
+            "similarity_boost": self.config.get('similarity_boost', 0.75)
+        }
+
+    def _synthesize(self, text, voice_id):
+        """Call the ElevenLabs API and return (MP3 bytes, character alignment), or (None, None).
+
+        The alignment is None unless timestamps are enabled.
+        """
+        url = f"{self.api_base}/v1/text-to-speech/{voice_id}"
+        if self.timestamps:
+            url += "/with-timestamps"
+
+        headers = {
+            "Accept": "application/json" if self.timestamps else "audio/mpeg",
+            "Content-Type": "application/json",
+            "xi-api-key": self.api_key
+        }
+
+        data = {
+            "text": text,
+            "model_id": self.model_id,
+            "voice_settings": self._voice_settings()
+        }
+
+        with metrics.stage_timer('tts'):
+            response = self.http.post(url, json=data, headers=headers)
+
+        if response.status_code == 200:
+            if not self.timestamps:
+                return response.content, None
+            payload = response.json()
+            return base64.b64decode(payload['audio_base64']), payload.get('alignment')
+
+        metrics.stage_failed('tts')
+        logger.error(f"Error generating voiceover: {response.status_code} - {response.text}")
+        return None, None
+
     def generate_voiceover(self, text, voice_id=None):
         """Generate AI voiceover from text"""
         try:
             voice_id = voice_id or self.config.get('default_voice', 'default')
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-            
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": self.api_key
-            }
-            
-            data = {
-                "text": text,
-                "model_id": "eleven_monolingual_v1",
-                "voice_settings": {
-                    "stability": self.config.get('stability', 0.75) ,
-                    "similarity_boost": self.config.get('similarity_boost', 0.75)
-                }
-            }
-            
+
             logger.info(f"Generating voiceover with voice ID: {voice_id}")
-            response = requests.post(url, json=data, headers=headers)
-            
-            if response.status_code == 200:
+            audio, _ = self._synthesize(text, voice_id)
+
+            if audio:
                 timestamp = int(time.time())
                 audio_file = os.path.join(self.output_dir, f"voiceover_{timestamp}.mp3")
-                
+
                 with open(audio_file, 'wb') as f:
-                    f.write(response.content)
-                
+                    f.write(audio)
+
                 logger.info(f"Voiceover saved to {audio_file}")
                 return audio_file
             else:
-                logger.error(f"Error generating voiceover: {response.status_code} - {response.text}")
                 return None
-                
+
         except Exception as e:
             logger.error(f"Exception in generate_voiceover: {e}")
             return None
-    
-    def generate_from_script(self, script):
-        """Generate voiceover from script object"""
+
+    def _sentence_key(self, sentence, voice_id):
+        settings = self._voice_settings()
+        return cache_key(sentence, voice_id, self.model_id, settings['stability'], settings['similarity_boost'])
+
+    def _synthesize_sentence(self, sentence, voice_id):
+        """Synthesize one sentence into the cache and return its path, or None"""
+        cache_path = os.path.join(self.cache_dir, f"{self._sentence_key(sentence, voice_id)}.mp3")
+
+        with self.inflight_lock:
+            future = self.inflight.get(cache_path)
+            owner = future is None
+            if owner:
+                # An earlier request may have finished since the cache was checked
+                if os.path.exists(cache_path):
+                    return cache_path
+                future = concurrent.futures.Future()
+                self.inflight[cache_path] = future
+
+        if not owner:
+            logger.info("Waiting for identical in-flight sentence synthesis")
+            return future.result()
+
         try:
-            # Combine script sections
-            text = f"{script['hook']} {script['body']} {script['cta']}"
-            return self.generate_voiceover(text)
+            audio, alignment = self._synthesize(sentence, voice_id)
+            if not audio:
+                future.set_result(None)
+                return None
+
+            tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(audio)
+            # Timing first, so a cached sentence always has its alignment
+            save_json({'alignment': alignment}, self._timing_file(cache_path))
+            os.replace(tmp_path, cache_path)
+            future.set_result(cache_path)
+            return cache_path
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.inflight_lock:
+                del self.inflight[cache_path]
+
+    def _timing_file(self, cache_path):
+        return os.path.splitext(cache_path)[0] + '.json'
+
+    def _sentence_timing(self, cache_path):
+        """Duration and alignment of a cached sentence; the duration is probed once"""
+        timing_file = self._timing_file(cache_path)
+        timing = load_json(timing_file) if os.path.exists(timing_file) else {}
+        if 'duration' not in timing:
+            timing = {'duration': probe(cache_path)['duration'], 'alignment': timing.get('alignment')}
+            save_json(timing, timing_file)
+        return timing
+
+    def _write_timing(self, audio_file, sentences, paths):
+        """Write the word timing sidecar of a joined voiceover.
+
+        Sentences synthesized without an alignment get their words spread
+        over the sentence's duration.
+        """
+        words = []
+        sections = {}
+        offset = 0.0
+        for section, sentence in sentences:
+            timing = self._sentence_timing(paths[sentence])
+            end = offset + timing['duration']
+            if timing.get('alignment'):
+                sentence_words = words_from_alignment(timing['alignment'], offset)
+            else:
+                sentence_words = spread_words(sentence, offset, end)
+            for word in sentence_words:
+                word['section'] = section
+            words.extend(sentence_words)
+
+            sections.setdefault(section, [round(offset, 3), 0.0])[1] = round(end, 3)
+            offset = end
+
+        save_json({'duration': round(offset, 3), 'sections': sections, 'words': words}, timing_path(audio_file))
+
+    def generate_from_script(self, script, voice_id=None):
+        """Generate voiceover from script object, one cached sentence at a time"""
+        try:
+            voice_id = voice_id or self.config.get('default_voice', 'default')
+
+            # Split script sections into (section, sentence) pairs
+            sentences = []
+            for section in ('hook', 'body', 'cta'):
+                sentences.extend((section, sentence) for sentence in split_sentences(script[section]))
+
+            if not sentences:
+                logger.error("Script has no text to synthesize")
+                return None
+
+            # Resolve cached sentences, synthesize the rest concurrently
+            paths = {}
+            misses = []
+            for _, sentence in sentences:
+                key = self._sentence_key(sentence, voice_id)
+                cache_path = os.path.join(self.cache_dir, f"{key}.mp3")
+                cached = os.path.exists(cache_path)
+                metrics.cache_lookup('tts', cached)
+                if cached:
+                    paths[sentence] = cache_path
+                elif sentence not in misses:
+                    misses.append(sentence)
+
+            logger.info(f"Generating voiceover with voice ID: {voice_id} ({len(sentences) - len(misses)} cached, {len(misses)} new sentences)")
+
+            if misses:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    future_to_sentence = {
+                        executor.submit(self._synthesize_sentence, sentence, voice_id): sentence
+                        for sentence in misses
+                    }
+                    for future in concurrent.futures.as_completed(future_to_sentence):
+                        sentence = future_to_sentence[future]
+                        path = future.result()
+                        if not path:
+                            logger.error(f"Failed to synthesize sentence: {sentence}")
+                            return None
+                        paths[sentence] = path
+
+            # MP3 is frame based, so the pieces can be joined byte for byte
+            timestamp = int(time.time())
+            audio_file = os.path.join(
+                self.output_dir, f"voiceover_{timestamp}_{cache_key([s for _, s in sentences], voice_id)[:8]}.mp3"
+            )
+            with open(audio_file, 'wb') as out:
+                for _, sentence in sentences:
+                    with open(paths[sentence], 'rb') as f:
+                        out.write(f.read())
+            try:
+                self._write_timing(audio_file, sentences, paths)
+            except Exception as e:
+                # Captions fall back to proportional timing
+                logger.warning(f"Could not write word timing for {audio_file}: {e}")
+
+            logger.info(f"Voiceover saved to {audio_file}")
+            return audio_file
         except Exception as e:
             logger.error(f"Error generating voiceover from script: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,66 @@
+import os
+
+from modules.clip_normalizer import ClipNormalizer
+from utils.clip_cache import ClipCache
+from utils.helpers import load_json
+
+
+def write(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def test_eviction_forgets_normalized_copy(tmp_path):
+    cache = ClipCache(cache_dir=str(tmp_path / 'cache'), clip_dir=str(tmp_path / 'video'), max_disk_mb=1.5 / 1024)
+    normalizer = ClipNormalizer({}, index_file=str(tmp_path / 'cache' / 'normalized_clips.json'))
+    cache.on_evict = normalizer.forget
+
+    source = write(str(tmp_path / 'video' / 'old.mp4'), 512)
+    normalized = write(normalizer.normalized_path(source), 512)
+    digest = normalizer.source_hash(source)
+    normalizer.normalized[digest] = {'source': source, 'path': normalized}
+    cache.put_clip(1, 'sd', source)
+    cache.attach(1, 'sd', normalized)
+
+    cache.put_clip(2, 'sd', write(str(tmp_path / 'video' / 'new.mp4'), 1024))
+
+    assert not os.path.exists(normalized)
+    assert normalizer.normalized == {}
+    assert normalizer.sources == {}
+    assert load_json(normalizer.index_file) == {'normalized': {}, 'sources': {}}
+
+
+def test_rehash_replaces_stale_memo(tmp_path):
+    normalizer = ClipNormalizer({}, index_file=str(tmp_path / 'normalized_clips.json'))
+    source = write(str(tmp_path / 'clip.mp4'), 10)
+    first = normalizer.source_hash(source)
+
+    write(source, 20)
+    assert normalizer.source_hash(source) != first
+    assert len(normalizer.sources) == 1
+
+
+def test_processes_sharing_a_cache_keep_each_others_clips(tmp_path):
+    dirs = dict(cache_dir=str(tmp_path / 'cache'), clip_dir=str(tmp_path / 'video'))
+    first, second = ClipCache(**dirs), ClipCache(**dirs)
+
+    first.put_clip(1, 'sd', write(first.clip_path(1, 'sd'), 10))
+    second.put_clip(2, 'sd', write(second.clip_path(2, 'sd'), 10))
+    first.put_clip(3, 'sd', write(first.clip_path(3, 'sd'), 10))
+
+    assert set(load_json(first.index_file)['clips']) == {'1_sd', '2_sd', '3_sd'}
+
+
+def test_merge_keeps_local_evictions(tmp_path):
+    dirs = dict(cache_dir=str(tmp_path / 'cache'), clip_dir=str(tmp_path / 'video'))
+    first = ClipCache(max_disk_mb=1.5 / 1024, **dirs)
+    first.put_clip(1, 'sd', write(first.clip_path(1, 'sd'), 1024))
+    second = ClipCache(**dirs)
+
+    # Evicts clip 1, which the second process still has in memory
+    first.put_clip(2, 'sd', write(first.clip_path(2, 'sd'), 1024))
+    second.dirty = True
+    second.flush()
+
+    assert set(load_json(first.index_file)['clips']) == {'2_sd'}
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from modules.cut_planner import CutPlanner
+
+
+@pytest.fixture
+def planner(tmp_path):
+    return CutPlanner(cache_file=str(tmp_path / 'probe_cache.json'))
+
+
+def clip(planner, tmp_path, name, duration):
+    """A clip file whose probe result is already cached, so ffprobe never runs"""
+    path = str(tmp_path / name)
+    with open(path, 'wb') as f:
+        f.write(b'x')
+    stat = os.stat(path)
+    planner.probes[path] = {'signature': f"{stat.st_size}:{stat.st_mtime}", 'info': {'duration': duration}}
+    return path
+
+
+def test_cuts_fill_duration_in_clip_order(planner, tmp_path):
+    files = [clip(planner, tmp_path, 'a.mp4', 4.0), clip(planner, tmp_path, 'b.mp4', 10.0)]
+    cuts = planner.plan(files, 6.0)
+
+    assert [(cut['file'], cut['in'], cut['out'], cut['loops']) for cut in cuts] == [
+        (files[0], 0.0, 4.0, 1),
+        (files[1], 0.0, 2.0, 1)
+    ]
+    assert sum(cut['duration'] for cut in cuts) == 6.0
+
+
+def test_probes_only_uncached_clips_it_uses(planner, tmp_path, monkeypatch):
+    probed = []
+    monkeypatch.setattr('modules.cut_planner.probe', lambda path: probed.append(path) or {'duration': 2.0})
+    first = clip(planner, tmp_path, 'a.mp4', 3.0)
+    second = clip(planner, tmp_path, 'b.mp4', 0)
+    del planner.probes[second]
+    third = clip(planner, tmp_path, 'c.mp4', 3.0)
+
+    cuts = planner.plan([first, second, third], 5.0)
+
+    assert probed == [second]
+    assert [cut['file'] for cut in cuts] == [first, second]
+    assert planner.plan([first, second], 5.0) == cuts
+    assert probed == [second]
+
+
+def test_short_footage_loops_last_clip(planner, tmp_path):
+    files = [clip(planner, tmp_path, 'a.mp4', 2.0), clip(planner, tmp_path, 'b.mp4', 3.0)]
+    last = planner.plan(files, 12.0)[-1]
+
+    assert (last['in'], last['out'], last['loops']) == (0.0, 3.0, 4)
+    assert last['duration'] == 10.0
+
+
+def test_clips_without_duration_are_skipped(planner, tmp_path):
+    files = [
+        clip(planner, tmp_path, 'still.mp4', 0),
+        str(tmp_path / 'missing.mp4'),
+        clip(planner, tmp_path, 'a.mp4', 5.0)
+    ]
+    assert [cut['file'] for cut in planner.plan(files, 3.0)] == [files[2]]
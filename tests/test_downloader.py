@@ -0,0 +1,121 @@
+import io
+import os
+import json
+import pytest
+from utils.downloader import Downloader
+
+DATA = bytes(range(256)) * 64
+
+class FakeRaw:
+    def __init__(self, body):
+        self.body = io.BytesIO(body)
+
+    def readinto(self, view):
+        return self.body.readinto(view)
+
+class FakeResponse:
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.raw = FakeRaw(body)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class FakeHTTP:
+    """Serves DATA with HEAD and Range support, recording every GET's Range header"""
+
+    def __init__(self, head=True, ranges=True, truncate=None):
+        self.head = head
+        self.ranges = ranges
+        self.truncate = truncate
+        self.gets = []
+
+    def request(self, method, url, **kwargs):
+        if not self.head:
+            return FakeResponse(405)
+        headers = {'Content-Length': str(len(DATA))}
+        if self.ranges:
+            headers['Accept-Ranges'] = 'bytes'
+        return FakeResponse(200, headers=headers)
+
+    def get(self, url, headers=None, stream=False):
+        byte_range = (headers or {}).get('Range')
+        self.gets.append(byte_range)
+        if byte_range:
+            start, _, end = byte_range[len('bytes='):].partition('-')
+            start, end = int(start), int(end) if end else len(DATA) - 1
+            if start >= len(DATA):
+                return FakeResponse(416)
+            return FakeResponse(206, DATA[start:end + 1],
+                                {'Content-Range': f"bytes {start}-{end}/{len(DATA)}"})
+        body = DATA[:self.truncate] if self.truncate else DATA
+        return FakeResponse(200, body, {'Content-Length': str(len(DATA))})
+
+def test_stream_download(tmp_path):
+    dest = str(tmp_path / 'clip.mp4')
+    Downloader(FakeHTTP(), segments=1).download('http://cdn/clip.mp4', dest)
+    assert open(dest, 'rb').read() == DATA
+    assert not os.path.exists(dest + '.part')
+
+def test_stream_resumes_partial_file(tmp_path):
+    dest = str(tmp_path / 'clip.mp4')
+    with open(dest + '.part', 'wb') as f:
+        f.write(DATA[:1000])
+    http = FakeHTTP()
+    downloader = Downloader(http, segments=1)
+    downloader.download('http://cdn/clip.mp4', dest)
+    assert http.gets == ['bytes=1000-']
+    assert open(dest, 'rb').read() == DATA
+    assert downloader.get_stats()['resumed'] == 1
+
+def test_complete_part_file_is_renamed_without_a_request(tmp_path):
+    dest = str(tmp_path / 'clip.mp4')
+    with open(dest + '.part', 'wb') as f:
+        f.write(DATA)
+    http = FakeHTTP()
+    Downloader(http, segments=1).download('http://cdn/clip.mp4', dest)
+    assert http.gets == []
+    assert open(dest, 'rb').read() == DATA
+
+def test_size_comes_from_get_when_head_fails(tmp_path):
+    dest = str(tmp_path / 'clip.mp4')
+    with pytest.raises(IOError, match='Size mismatch'):
+        Downloader(FakeHTTP(head=False, truncate=100), segments=1).download('http://cdn/clip.mp4', dest)
+    assert not os.path.exists(dest)
+
+def test_rejected_response_is_closed(tmp_path):
+    http = FakeHTTP(head=False)
+    responses = []
+    http.get = lambda *args, **kwargs: responses.append(FakeResponse(403)) or responses[-1]
+    with pytest.raises(IOError):
+        Downloader(http, segments=1).download('http://cdn/clip.mp4', str(tmp_path / 'clip.mp4'))
+    assert responses[0].closed
+
+def test_segmented_download_resumes_from_state(tmp_path):
+    dest = str(tmp_path / 'clip.mp4')
+    segment = len(DATA) // 2
+    # First segment finished, second one 100 bytes in
+    with open(dest + '.part', 'wb') as f:
+        f.write(DATA[:segment + 100].ljust(len(DATA), b'\0'))
+    with open(dest + '.part.json', 'w') as f:
+        json.dump({'url': 'http://cdn/clip.mp4', 'size': len(DATA), 'segments': [
+            {'start': 0, 'end': segment - 1, 'done': segment},
+            {'start': segment, 'end': len(DATA) - 1, 'done': 100}
+        ]}, f)
+
+    http = FakeHTTP()
+    downloader = Downloader(http, segments=2, min_segment_mb=len(DATA) / 2 / 1024 / 1024, buffer_kb=1)
+    downloader.download('http://cdn/clip.mp4', dest)
+
+    assert http.gets == [f"bytes={segment + 100}-{len(DATA) - 1}"]
+    assert open(dest, 'rb').read() == DATA
+    assert not os.path.exists(dest + '.part.json')
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
@@ -0,0 +1,30 @@
+import pytest
+import requests
+from utils.http_client import HTTPClient, _ProviderRetry
+
+def make_retry():
+    return _ProviderRetry(total=3, status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=frozenset(['GET', 'HEAD']))
+
+@pytest.mark.parametrize('status', [429, 500, 502, 503, 504])
+def test_get_retries_every_listed_status(status):
+    assert make_retry().is_retry('GET', status)
+
+@pytest.mark.parametrize('status,retried', [(429, True), (503, True), (500, False), (502, False), (504, False)])
+def test_post_only_retries_turned_away_requests(status, retried):
+    assert make_retry().is_retry('POST', status) is retried
+
+def test_post_is_not_replayed_after_a_read_error():
+    retry = make_retry()
+    assert not retry._is_method_retryable('POST')
+    assert retry._is_method_retryable('GET')
+
+def test_host_slot_wait_is_bounded():
+    client = HTTPClient(pool_maxsize=1, pool_timeout=0.05)
+    slot = client._acquire('example.com')
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client._acquire('example.com')
+    slot.release()
+    # Other hosts have their own slots
+    client._acquire('example.org').release()
+    client._acquire('example.com').release()
@@ -0,0 +1,55 @@
+import os
+from utils.job_store import JobStore
+from batch_processor import BatchProcessor
+
+IDEA = {'id': 1, 'title': 'Done', 'script': {'hook': 'a', 'body': 'b', 'cta': 'c'}}
+
+class Counter:
+    def __init__(self, result):
+        self.calls = 0
+        self.result = result
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.result
+
+def test_checkpoint_never_moves_back(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    store.create_batch('b', [IDEA])
+    store.checkpoint('b', 1, 'rendered', video_path='out.mp4')
+    store.checkpoint('b', 1, 'clips', video_files=['x.mp4'])
+
+    job = store.get_jobs('b')[0]
+    assert job['stage'] == 'rendered'
+    assert job['video_files'] == ['x.mp4']
+    assert job['video_path'] == 'out.mp4'
+
+def test_resume_skips_rendered_job_with_evicted_inputs(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    store.create_batch('b', [IDEA])
+    video_path = tmp_path / 'done.mp4'
+    video_path.write_bytes(b'mp4')
+    # Audio and clips were evicted since the video was rendered
+    store.checkpoint('b', 1, 'rendered', audio_file=str(tmp_path / 'gone.mp3'),
+                     video_files=[str(tmp_path / 'gone.mp4')], video_path=str(video_path))
+
+    processor = BatchProcessor.__new__(BatchProcessor)
+    processor.job_store = store
+    processor.render_pool = None
+    processor.voice_gen = type('Voice', (), {'generate_from_script': Counter('new.mp3')})()
+    processor.video_sel = type('Selector', (), {
+        'select_videos_for_script': Counter(['new.mp4']),
+        'release_clips': Counter(None)
+    })()
+    processor.video_ed = type('Editor', (), {'create_video': Counter('again.mp4')})()
+
+    job = processor._make_job(IDEA, 'b', store.get_jobs('b')[0])
+    for stage in (processor._voice_stage, processor._clip_stage, processor._render_stage):
+        job = stage(job)
+
+    assert job['video_path'] == str(video_path)
+    assert processor.voice_gen.generate_from_script.calls == 0
+    assert processor.video_sel.select_videos_for_script.calls == 0
+    assert processor.video_ed.create_video.calls == 0
+    assert store.get_jobs('b')[0]['stage'] == 'rendered'
+    assert os.path.exists(job['video_path'])
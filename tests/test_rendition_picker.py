@@ -0,0 +1,34 @@
+from modules.rendition_picker import RenditionPicker
+
+VIDEO = {
+    'id': 1,
+    'duration': 10,
+    'video_files': [
+        {'id': 1, 'quality': 'hd', 'width': 2160, 'height': 3840, 'fps': 30, 'link': 'https://example.com/4k.mp4'},
+        {'id': 2, 'quality': 'hd', 'width': 1080, 'height': 1920, 'fps': 30, 'link': 'https://example.com/hd.mp4'},
+        {'id': 3, 'quality': 'sd', 'width': 540, 'height': 960, 'fps': 30, 'link': 'https://example.com/sd.mp4'}
+    ]
+}
+
+
+def test_picks_smallest_rendition_covering_output():
+    assert RenditionPicker(1080, 1920).pick(VIDEO)['id'] == 2
+
+
+def test_pick_alone_counts_no_savings():
+    picker = RenditionPicker(1080, 1920)
+    picker.pick(VIDEO)
+    stats = picker.get_stats()
+    assert stats['picked'] == 1
+    assert stats['downloads'] == 0
+    assert stats['estimated_bytes_saved'] == 0
+
+
+def test_savings_scale_the_real_download_size():
+    picker = RenditionPicker(1080, 1920)
+    picker.record_download(VIDEO, picker.pick(VIDEO), 1000)
+    stats = picker.get_stats()
+    assert stats['downloaded_bytes'] == 1000
+    # The 4K baseline has four times the pixels
+    assert stats['estimated_baseline_bytes'] == 4000
+    assert stats['estimated_bytes_saved'] == 3000
@@ -0,0 +1,63 @@
+import pytest
+from utils.script_index import ScriptIndex, choose_bands, candidate_probability
+
+SCRIPT = {
+    'hook': "Stop scrolling, this changes how you think about your mornings.",
+    'body': "First, start small with one habit every single day. Second, track what works and drop what "
+            "does not. Third, share your progress so other people keep you honest.",
+    'cta': "Follow for more and comment your favourite tip!"
+}
+OTHER = {
+    'hook': "Nobody tells you this about saving money on groceries.",
+    'body': "Plan meals around what is on sale, buy store brands and never shop hungry.",
+    'cta': "Save this for your next shopping trip."
+}
+
+@pytest.fixture
+def index(tmp_path):
+    return ScriptIndex(index_file=str(tmp_path / 'script_index.json'))
+
+def edited(script, section, text):
+    return dict(script, **{section: text})
+
+def test_bands_reach_the_recall_at_the_threshold():
+    for threshold in (0.3, 0.5, 0.7, 0.9):
+        bands = choose_bands(64, threshold)
+        assert 64 % bands == 0
+        assert candidate_probability(threshold, bands, 64 // bands) >= 0.99
+
+def test_default_bands_follow_the_threshold(index):
+    assert (index.bands, index.rows) == (32, 2)
+
+def test_identical_and_edited_scripts_match(index):
+    index.record(SCRIPT, title='Mornings')
+    entry_id, entry, similarity = index.find(SCRIPT)
+    assert similarity == 1.0 and entry['title'] == 'Mornings'
+
+    match = index.find(edited(SCRIPT, 'cta', "Follow for more and comment your best tip!"))
+    assert match and match[2] >= index.threshold
+
+def test_unrelated_script_does_not_match(index):
+    index.record(SCRIPT)
+    assert index.find(OTHER) is None
+
+def test_find_does_not_record(index):
+    assert index.find(SCRIPT) is None
+    assert index.find(SCRIPT) is None
+    assert index.get_stats()['scripts'] == 0
+
+def test_batch_entries_are_checked_without_recording(index):
+    entry_id, entry = index.entry(SCRIPT, title='Mornings')
+    match = index.match(index.signature(SCRIPT), batch={entry_id: entry})
+    assert match[0] == entry_id
+    assert index.get_stats()['scripts'] == 0
+
+def test_recorded_scripts_persist(index, tmp_path):
+    index.record(SCRIPT)
+    reloaded = ScriptIndex(index_file=str(tmp_path / 'script_index.json'))
+    assert reloaded.find(SCRIPT)[2] == 1.0
+
+def test_old_scripts_expire(tmp_path):
+    index = ScriptIndex(index_file=str(tmp_path / 'script_index.json'), history_days=-1)
+    index.record(SCRIPT)
+    assert index.get_stats()['scripts'] == 0
@@ -0,0 +1,69 @@
+import pytest
+
+from modules.subtitles import words_from_alignment, spread_words, caption_events, _timestamp
+
+SCRIPT = {'hook': 'Stop scrolling now', 'body': 'Here is one simple trick', 'cta': 'Follow for more'}
+
+
+def timed(section, text, start, step=0.5):
+    return [
+        {'word': word, 'start': start + i * step, 'end': start + (i + 1) * step, 'section': section}
+        for i, word in enumerate(text.split())
+    ]
+
+
+def test_words_from_alignment():
+    alignment = {
+        'characters': list('Hi  yo'),
+        'character_start_times_seconds': [0.0, 0.1, 0.2, 0.3, 0.4, 0.5],
+        'character_end_times_seconds': [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+    }
+    assert words_from_alignment(alignment, offset=1.0) == [
+        {'word': 'Hi', 'start': 1.0, 'end': 1.2},
+        {'word': 'yo', 'start': 1.4, 'end': 1.6}
+    ]
+
+
+def test_spread_words_covers_span_by_length():
+    words = spread_words('a bbb', 0.0, 6.0)
+    assert [(word['start'], word['end']) for word in words] == [(0.0, 2.0), (2.0, 6.0)]
+
+
+def test_captions_follow_word_timing():
+    timing = {
+        'sections': {'hook': [0.0, 1.5], 'body': [1.5, 4.0], 'cta': [4.0, 5.5]},
+        'words': timed('hook', SCRIPT['hook'], 0.0) + timed('body', SCRIPT['body'], 1.5) + timed('cta', SCRIPT['cta'], 4.0)
+    }
+    events = caption_events(SCRIPT, timing, duration=6.0, max_words=2)
+
+    assert events == [
+        ('hook', 'Stop scrolling', 0.0, 1.0),
+        ('hook', 'now', 1.0, 1.5),
+        ('body', 'Here is', 1.5, 2.5),
+        ('body', 'one simple', 2.5, 3.5),
+        ('body', 'trick', 3.5, 4.0),
+        ('cta', 'Follow for', 4.0, 5.0),
+        # The last caption holds until the video ends
+        ('cta', 'more', 5.0, 6.0)
+    ]
+
+
+def test_edited_section_is_spread_over_its_span():
+    timing = {'sections': {'hook': [0.0, 2.0]}, 'words': timed('hook', 'Old hook text', 0.0)}
+    events = caption_events({'hook': 'New hook'}, timing, duration=2.0)
+    assert events == [('hook', 'New hook', 0.0, 2.0)]
+
+
+def test_without_timing_sections_share_duration_by_length():
+    events = caption_events({'hook': 'aaaa', 'cta': 'bbbbbbbbbbbb'}, None, duration=8.0)
+    assert events == [('hook', 'aaaa', 0.0, 2.0), ('cta', 'bbbbbbbbbbbb', 2.0, 8.0)]
+
+
+@pytest.mark.parametrize('seconds, expected', [
+    (0, '0:00:00.00'),
+    (61.257, '0:01:01.26'),
+    (3725.5, '1:02:05.50'),
+    (-1, '0:00:00.00')
+])
+def test_timestamp(seconds, expected):
+    assert _timestamp(seconds) == expected
@@ -0,0 +1,107 @@
+import os
+import threading
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import cache_key
+
+# Set up logger
+logger = setup_logger('base_cache')
+
+def _signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime}"
+
+class BaseCache:
+    """Disk cache of captionless base videos: the composed cuts plus voiceover.
+
+    A base is keyed by the cut list, the audio file and the render settings
+    that shape the footage, with source files identified by size and mtime
+    so an edited input never hits a stale base. Bases are evicted
+    least-recently-used once their total size exceeds `max_disk_mb`.
+    """
+
+    def __init__(self, cache_dir='assets/cache/base', max_disk_mb=1024):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def key(self, cuts, audio_file, settings):
+        """Cache key for the base rendered from these cuts, audio and settings"""
+        return cache_key(
+            [
+                [cut['file'], _signature(cut['file']), cut['in'], cut['out'], cut['loops'], cut['duration']]
+                for cut in cuts
+            ],
+            [audio_file, _signature(audio_file)],
+            {name: settings.get(name) for name in ('resolution', 'fps')}
+        )
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def tmp_path(self, key):
+        """Where a base is written before put() moves it into the cache"""
+        return os.path.join(self.cache_dir, f"{key}.tmp.mp4")
+
+    def lock_for(self, key):
+        """Per-base lock so concurrent renders build a base only once"""
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key):
+        """Path of the cached base, or None"""
+        path = self.path(key)
+        with self.lock:
+            if os.path.exists(path):
+                # mtime doubles as the last-used time for eviction
+                os.utime(path)
+                self.stats['hits'] += 1
+                return path
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, tmp_path):
+        """Move a finished base into the cache and return its path"""
+        path = self.path(key)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self._evict(keep=path)
+        return path
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['bases'] = len(self._entries())
+            stats['disk_bytes'] = sum(size for _, size, _ in self._entries())
+            return stats
+
+    def _entries(self):
+        """(path, size, mtime) of every cached base"""
+        entries = []
+        for item in os.scandir(self.cache_dir):
+            if item.is_file() and item.name.endswith('.mp4') and '.tmp' not in item.name:
+                stat = item.stat()
+                entries.append((item.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self, keep=None):
+        """Drop least-recently-used bases until under the disk budget"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_disk_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                self.stats['evictions'] += 1
+                logger.info(f"Evicted cached base {path}")
+            except Exception as e:
+                logger.error(f"Error evicting cached base {path}: {e}")
@@ -0,0 +1,269 @@
+import os
+import time
+import fcntl
+import atexit
+import threading
+import contextlib
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import load_json, save_json, cache_key
+
+# Set up logger
+logger = setup_logger('clip_cache')
+
+class ClipCache:
+    """Persistent cache for Pexels search responses and downloaded clips.
+
+    Search responses expire after `search_ttl` seconds. Downloaded clips are
+    keyed by Pexels video id and rendition and evicted least-recently-used
+    once their total size exceeds `max_disk_mb`. Clips pinned for a render
+    in progress are never evicted.
+
+    Hits only update `last_used` in memory; the index is written on the next
+    put or eviction, by flush(), and when the process exits. Several
+    processes can share a cache: each write merges with the index on disk
+    under a file lock instead of replacing it.
+    """
+
+    def __init__(self, cache_dir='assets/cache', clip_dir='assets/video', search_ttl=86400, max_disk_mb=2048):
+        self.cache_dir = cache_dir
+        self.clip_dir = clip_dir
+        self.search_ttl = search_ttl
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.index_file = os.path.join(cache_dir, 'clip_cache.json')
+        self.lock_file = f"{self.index_file}.lock"
+        os.makedirs(cache_dir, exist_ok=True)
+        os.makedirs(clip_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.pins = {}
+        self.dirty = False
+        # Clips dropped since the last save, with the time they were dropped
+        self.removed = {}
+        # Called with the file paths of every evicted clip, with the lock held
+        self.on_evict = None
+
+        index = load_json(self.index_file) if os.path.exists(self.index_file) else {}
+        self.searches = index.get('searches', {})
+        self.clips = index.get('clips', {})
+
+        self.stats = {
+            'search_hits': 0,
+            'search_misses': 0,
+            'clip_hits': 0,
+            'clip_misses': 0,
+            'evictions': 0
+        }
+        atexit.register(self.flush)
+        logger.info(f"ClipCache initialized with {len(self.clips)} clips ({self._disk_usage() / 1024 / 1024:.1f} MB)")
+
+    def get_search(self, keyword, orientation, per_page):
+        """Return cached search results, or None if missing or expired"""
+        key = cache_key('pexels_search', keyword, orientation, per_page)
+        with self.lock:
+            entry = self.searches.get(key)
+            if entry and time.time() - entry['fetched_at'] < self.search_ttl:
+                self.stats['search_hits'] += 1
+                return entry['videos']
+
+            if entry:
+                del self.searches[key]
+            self.stats['search_misses'] += 1
+            return None
+
+    def put_search(self, keyword, orientation, per_page, videos):
+        """Store search results"""
+        key = cache_key('pexels_search', keyword, orientation, per_page)
+        with self.lock:
+            self.searches[key] = {'fetched_at': time.time(), 'videos': videos}
+            self._prune_searches()
+            self._save()
+
+    def clip_key(self, video_id, rendition):
+        """Cache key for a Pexels video rendition"""
+        return f"{video_id}_{rendition}"
+
+    def clip_path(self, video_id, rendition):
+        """Local path a clip rendition is stored at"""
+        return os.path.join(self.clip_dir, f"pexels_{self.clip_key(video_id, rendition)}.mp4")
+
+    def lock_for(self, video_id, rendition):
+        """Per-clip lock so concurrent misses download a rendition only once"""
+        key = self.clip_key(video_id, rendition)
+        with self.lock:
+            if key not in self.key_locks:
+                self.key_locks[key] = threading.Lock()
+            return self.key_locks[key]
+
+    def get_clip(self, video_id, rendition, pin=False):
+        """Return the local path of a cached clip, or None.
+
+        With `pin`, a hit is also pinned until unpin() is called.
+        """
+        key = self.clip_key(video_id, rendition)
+        with self.lock:
+            entry = self.clips.get(key)
+            if entry and os.path.exists(entry['path']):
+                entry['last_used'] = time.time()
+                self.dirty = True
+                self.stats['clip_hits'] += 1
+                if pin:
+                    self._pin(key)
+                return entry['path']
+
+            if entry:
+                # File was removed behind our back
+                del self.clips[key]
+                self.removed[key] = time.time()
+                self.dirty = True
+            self.stats['clip_misses'] += 1
+            return None
+
+    def touch(self, video_id, rendition, pin=False):
+        """Mark a cached clip as just used without counting a lookup; False if it is not cached"""
+        key = self.clip_key(video_id, rendition)
+        with self.lock:
+            entry = self.clips.get(key)
+            if not entry:
+                return False
+            entry['last_used'] = time.time()
+            self.dirty = True
+            if pin:
+                self._pin(key)
+            return True
+
+    def put_clip(self, video_id, rendition, path, pin=False):
+        """Register a downloaded clip and evict old clips if over budget"""
+        key = self.clip_key(video_id, rendition)
+        with self.lock:
+            self.clips[key] = {
+                'path': path,
+                'size': os.path.getsize(path),
+                'last_used': time.time()
+            }
+            if pin:
+                self._pin(key)
+            self._evict(keep=key)
+            self._save(keep=key)
+
+    def unpin(self, video_id, rendition):
+        """Release a pin taken by get_clip, touch or put_clip"""
+        key = self.clip_key(video_id, rendition)
+        with self.lock:
+            count = self.pins.get(key, 0) - 1
+            if count > 0:
+                self.pins[key] = count
+            else:
+                self.pins.pop(key, None)
+
+    def flush(self):
+        """Write the index if hits changed it since the last save"""
+        with self.lock:
+            if self.dirty:
+                self._save()
+
+    def _pin(self, key):
+        self.pins[key] = self.pins.get(key, 0) + 1
+
+    def attach(self, video_id, rendition, derived_path):
+        """Track a file derived from a cached clip so it is evicted along with it"""
+        key = self.clip_key(video_id, rendition)
+        with self.lock:
+            entry = self.clips.get(key)
+            if not entry or derived_path in entry.get('derived', []) or not os.path.exists(derived_path):
+                return
+            entry.setdefault('derived', []).append(derived_path)
+            entry['size'] += os.path.getsize(derived_path)
+            self._evict(keep=key)
+            self._save(keep=key)
+
+    def get_stats(self):
+        """Hit/miss counters plus current disk usage"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats['clips'] = len(self.clips)
+            stats['pinned'] = len(self.pins)
+            stats['disk_bytes'] = self._disk_usage()
+            return stats
+
+    def _disk_usage(self):
+        return sum(entry['size'] for entry in self.clips.values())
+
+    def _evict(self, keep=None):
+        """Drop least-recently-used clips until under the disk budget"""
+        total = self._disk_usage()
+        candidates = sorted(
+            (entry['last_used'], key) for key, entry in self.clips.items() if key != keep and key not in self.pins
+        )
+
+        for _, key in candidates:
+            if total <= self.max_disk_bytes:
+                break
+
+            entry = self.clips.pop(key)
+            self.removed[key] = time.time()
+            total -= entry['size']
+            self.stats['evictions'] += 1
+            paths = [entry['path']] + entry.get('derived', [])
+            try:
+                for path in paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+                logger.info(f"Evicted cached clip {entry['path']}")
+            except Exception as e:
+                logger.error(f"Error evicting cached clip {entry['path']}: {e}")
+            if self.on_evict:
+                self.on_evict(paths)
+
+    def _prune_searches(self):
+        """Drop expired search responses"""
+        now = time.time()
+        expired = [key for key, entry in self.searches.items() if now - entry['fetched_at'] >= self.search_ttl]
+        for key in expired:
+            del self.searches[key]
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        """Exclusive lock on the index file across processes"""
+        with open(self.lock_file, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _merge(self, index):
+        """Fold entries other processes wrote into memory, keeping our own removals"""
+        for key, entry in index.get('searches', {}).items():
+            if key not in self.searches or entry['fetched_at'] > self.searches[key]['fetched_at']:
+                self.searches[key] = entry
+        self._prune_searches()
+
+        # Clips another process evicted
+        for key in [key for key, entry in self.clips.items() if not os.path.exists(entry['path'])]:
+            del self.clips[key]
+
+        for key, entry in index.get('clips', {}).items():
+            ours = self.clips.get(key)
+            if ours is None:
+                # Unless we dropped it and nobody has used it since
+                if entry['last_used'] > self.removed.get(key, 0) and os.path.exists(entry['path']):
+                    self.clips[key] = entry
+                continue
+
+            ours['last_used'] = max(ours['last_used'], entry['last_used'])
+            for path in entry.get('derived', []):
+                if path not in ours.get('derived', []) and os.path.exists(path):
+                    ours.setdefault('derived', []).append(path)
+                    ours['size'] += os.path.getsize(path)
+
+    def _save(self, keep=None):
+        with self._index_lock():
+            if os.path.exists(self.index_file):
+                self._merge(load_json(self.index_file))
+                self._evict(keep=keep)
+            self.removed = {}
+            self.dirty = False
+            save_json({'searches': self.searches, 'clips': self.clips}, self.index_file)
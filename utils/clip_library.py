@@ -0,0 +1,230 @@
+import os
+import re
+import time
+import threading
+from urllib.parse import urlparse
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import load_json, save_json
+from utils.media import probe
+
+# Set up logger
+logger = setup_logger('clip_library')
+
+# pexels_<video id>_<rendition>.mp4, as written by ClipCache.clip_path
+_PEXELS_FILE = re.compile(r'^pexels_(\d+)_(.+)$')
+# <keyword>_<timestamp>.mp4, as written by VideoSelector.download_video
+_KEYWORD_FILE = re.compile(r'^(.+?)_(\d{9,})$')
+# Normalized copies made by ClipNormalizer end in _<width>x<height>
+_DERIVED_SUFFIX = re.compile(r'_\d+x\d+$')
+
+def _normalize_tag(tag):
+    tag = re.sub(r'[^\w]', '', str(tag).lower())
+    # Crude plural folding so "mountains" finds "mountain"
+    if len(tag) > 4 and tag.endswith('s') and not tag.endswith('ss'):
+        tag = tag[:-1]
+    return tag
+
+def tags_from_url(url):
+    """Tags from a Pexels page URL slug, e.g. /video/woman-drinking-coffee-1234/"""
+    if not url:
+        return []
+    slug = urlparse(url).path.rstrip('/').split('/')[-1]
+    words = [word for word in slug.split('-') if word and not word.isdigit()]
+    return [_normalize_tag(word) for word in words if len(word) > 2]
+
+class ClipLibrary:
+    """Persistent index of the clips in the local video directory.
+
+    Every clip is probed once for duration, resolution, fps and codec and
+    stored with its tags (the search keyword, Pexels URL slug words, or the
+    keyword in its filename) and Pexels id. New files are picked up on
+    refresh() or registered directly with add(); unchanged files are never
+    probed again. query() answers from an in-memory tag index.
+    """
+
+    def __init__(self, clip_dir='assets/video', index_file='assets/cache/clip_library.json',
+                 width=1080, height=1920, max_upscale=1.5):
+        self.clip_dir = clip_dir
+        self.index_file = index_file
+        self.width = width
+        self.height = height
+        self.max_upscale = max_upscale
+        os.makedirs(os.path.dirname(index_file) or '.', exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.clips = load_json(index_file).get('clips', {}) if os.path.exists(index_file) else {}
+        self.by_tag = {}
+        for path, entry in self.clips.items():
+            self._index(path, entry)
+
+        self.stats = {'hits': 0, 'misses': 0, 'probed': 0}
+        logger.info(f"ClipLibrary initialized with {len(self.clips)} clips")
+
+    def _index(self, path, entry):
+        for tag in entry.get('tags', []):
+            self.by_tag.setdefault(tag, set()).add(path)
+
+    def _unindex(self, path, entry):
+        for tag in entry.get('tags', []):
+            paths = self.by_tag.get(tag)
+            if paths:
+                paths.discard(path)
+                if not paths:
+                    del self.by_tag[tag]
+
+    def _filename_metadata(self, path):
+        """Pexels id, rendition and tags implied by a library filename"""
+        name = os.path.splitext(os.path.basename(path))[0]
+        match = _PEXELS_FILE.match(name)
+        if match:
+            return {'pexels_id': int(match.group(1)), 'rendition': match.group(2), 'tags': []}
+        match = _KEYWORD_FILE.match(name)
+        if match:
+            return {'pexels_id': None, 'rendition': None, 'tags': [_normalize_tag(match.group(1))]}
+        return {'pexels_id': None, 'rendition': None, 'tags': [_normalize_tag(name)]}
+
+    def _is_derived(self, path):
+        """Whether path is a normalized copy of another clip in the library directory"""
+        base, ext = os.path.splitext(path)
+        source = _DERIVED_SUFFIX.sub('', base)
+        return source != base and os.path.exists(source + ext)
+
+    def add(self, path, tags=(), pexels_id=None, rendition=None, url=None, save=True):
+        """Register a clip, probing it if it is new or changed; returns its entry or None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        with self.lock:
+            entry = self.clips.get(path)
+            unchanged = entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+
+        if not unchanged:
+            try:
+                info = probe(path)
+            except Exception as e:
+                logger.error(f"Error probing {path}: {e}")
+                return None
+            if not info.get('width') or not info.get('duration'):
+                return None
+
+            metadata = self._filename_metadata(path)
+            entry = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'duration': info['duration'],
+                'width': info['width'],
+                'height': info['height'],
+                'fps': info.get('fps'),
+                'codec': info.get('codec'),
+                'pexels_id': metadata['pexels_id'],
+                'rendition': metadata['rendition'],
+                'tags': metadata['tags'],
+                'added_at': time.time()
+            }
+            with self.lock:
+                self.stats['probed'] += 1
+
+        extra = {_normalize_tag(tag) for tag in tags} | set(tags_from_url(url))
+        extra.discard('')
+        with self.lock:
+            old = self.clips.get(path)
+            tags = set(entry['tags']) | extra | set(old.get('tags', []) if old else ())
+            if unchanged and tags == set(old['tags']) and (not pexels_id or old.get('pexels_id')):
+                return old
+
+            if old:
+                self._unindex(path, old)
+            entry['tags'] = sorted(tags)
+            entry['pexels_id'] = entry.get('pexels_id') or pexels_id
+            entry['rendition'] = entry.get('rendition') or (str(rendition) if rendition is not None else None)
+
+            self.clips[path] = entry
+            self._index(path, entry)
+            if save:
+                self._save()
+        return entry
+
+    def refresh(self):
+        """Index new or changed files in the clip directory and forget deleted ones"""
+        if not os.path.isdir(self.clip_dir):
+            return 0
+
+        present = set()
+        added = 0
+        for item in os.scandir(self.clip_dir):
+            if not item.is_file() or not item.name.endswith('.mp4') or '.tmp' in item.name:
+                continue
+            path = os.path.join(self.clip_dir, item.name)
+            if self._is_derived(path):
+                continue
+            present.add(path)
+
+            with self.lock:
+                entry = self.clips.get(path)
+            stat = item.stat()
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                continue
+            if self.add(path, save=False):
+                added += 1
+
+        with self.lock:
+            removed = [path for path in self.clips if path not in present]
+            for path in removed:
+                self._unindex(path, self.clips.pop(path))
+            if added or removed:
+                self._save()
+
+        logger.info(f"Library refresh: {added} clips indexed, {len(removed)} removed, {len(self.clips)} total")
+        return added
+
+    def usable(self, entry, min_duration=0):
+        """Whether a clip can fill the output frame without too much upscaling"""
+        scale = max(self.width / entry['width'], self.height / entry['height'])
+        return scale <= self.max_upscale and entry['duration'] >= min_duration
+
+    def query(self, keyword, exclude=(), min_duration=0):
+        """Best local clip for a keyword as (path, entry), or None"""
+        tag = _normalize_tag(keyword)
+        with self.lock:
+            candidates = [
+                (path, self.clips[path]) for path in self.by_tag.get(tag, ())
+                if path not in exclude and self.usable(self.clips[path], min_duration)
+            ]
+
+        # Prefer clips that need no upscaling, then the longest
+        candidates.sort(key=lambda item: (
+            max(self.width / item[1]['width'], self.height / item[1]['height']) > 1.0,
+            -item[1]['duration'],
+            item[0]
+        ))
+        for path, entry in candidates:
+            if os.path.exists(path):
+                with self.lock:
+                    self.stats['hits'] += 1
+                return path, entry
+            self.forget(path)
+
+        with self.lock:
+            self.stats['misses'] += 1
+        return None
+
+    def forget(self, path):
+        with self.lock:
+            entry = self.clips.pop(path, None)
+            if entry:
+                self._unindex(path, entry)
+                self._save()
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['clips'] = len(self.clips)
+            stats['tags'] = len(self.by_tag)
+            return stats
+
+    def _save(self):
+        save_json({'clips': self.clips}, self.index_file)
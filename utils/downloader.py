@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import threading
+import concurrent.futures
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import save_json
+from utils import metrics
+
+# Set up logger
+logger = setup_logger('downloader')
+
+class Downloader:
+    """Segmented, resumable file downloads.
+
+    Large files are fetched as parallel HTTP Range requests straight into a
+    preallocated `.part` file using a reusable buffer. Progress is kept in a
+    `.part.json` sidecar so an interrupted download picks up where it left
+    off. The file is only renamed to its final path once its size checks out.
+    """
+
+    def __init__(self, http, segments=4, min_segment_mb=8, buffer_kb=1024, retries=2):
+        self.http = http
+        self.segments = max(1, segments)
+        self.min_segment_bytes = int(min_segment_mb * 1024 * 1024)
+        self.buffer_size = int(buffer_kb * 1024)
+        self.retries = retries
+
+        self.lock = threading.Lock()
+        self.stats = {'files': 0, 'bytes': 0, 'resumed': 0, 'seconds': 0.0}
+
+    def download(self, url, dest):
+        """Download url to dest and return dest; raises on failure"""
+        with metrics.stage_timer('download'):
+            return self._download(url, dest)
+
+    def _download(self, url, dest):
+        start_time = time.time()
+        part_path = f"{dest}.part"
+        state_path = f"{dest}.part.json"
+
+        size, ranges = self._inspect(url)
+
+        if size and ranges and size >= 2 * self.min_segment_bytes and self.segments > 1:
+            written = self._download_segmented(url, part_path, state_path, size)
+        else:
+            written, size = self._download_stream(url, part_path, size, ranges)
+
+        actual_size = os.path.getsize(part_path)
+        if size and actual_size != size:
+            raise IOError(f"Size mismatch for {url}: expected {size} bytes, got {actual_size}")
+
+        os.replace(part_path, dest)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+        with self.lock:
+            self.stats['files'] += 1
+            self.stats['bytes'] += written
+            self.stats['seconds'] += time.time() - start_time
+        metrics.DOWNLOAD_BYTES.inc(written)
+        return dest
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def _inspect(self, url):
+        """Return (content length or None, whether byte ranges are supported)"""
+        response = self.http.request('HEAD', url, allow_redirects=True)
+        if response.status_code != 200:
+            return None, False
+        size = response.headers.get('Content-Length')
+        ranges = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+        return (int(size) if size else None), ranges
+
+    def _read_into(self, response, f, buffer, limit=None):
+        """Copy a streamed response body into f, returning the bytes written"""
+        view = memoryview(buffer)
+        written = 0
+        while limit is None or written < limit:
+            want = len(view) if limit is None else min(len(view), limit - written)
+            n = response.raw.readinto(view[:want])
+            if not n:
+                break
+            f.write(view[:n])
+            written += n
+        return written
+
+    def _download_stream(self, url, part_path, size, ranges):
+        """Single connection download, resuming an existing .part when possible.
+
+        Returns (bytes written, expected size or None); the size falls back to
+        the GET response when HEAD did not report one.
+        """
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) and ranges else 0
+        if size and offset > size:
+            offset = 0
+        if size and offset == size:
+            # Finished before an earlier run could rename it
+            logger.info(f"{part_path} is already complete")
+            return 0, size
+
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
+        response = self.http.get(url, headers=headers, stream=True)
+
+        if response.status_code == 206 and offset:
+            logger.info(f"Resuming {url} at byte {offset}")
+            with self.lock:
+                self.stats['resumed'] += 1
+            mode = 'ab'
+            # Content-Range: bytes <start>-<end>/<total>
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            if not size and total.isdigit():
+                size = int(total)
+        elif response.status_code == 200:
+            mode = 'wb'
+            length = response.headers.get('Content-Length')
+            if not size and length and length.isdigit():
+                size = int(length)
+        else:
+            # Release the connection back to the pool before failing
+            response.close()
+            raise IOError(f"Error downloading {url}: {response.status_code}")
+
+        buffer = bytearray(self.buffer_size)
+        with response, open(part_path, mode) as f:
+            return self._read_into(response, f, buffer), size
+
+    def _download_segmented(self, url, part_path, state_path, size):
+        """Fetch byte ranges in parallel into a preallocated .part file"""
+        state = None
+        if os.path.exists(state_path) and os.path.exists(part_path):
+            try:
+                with open(state_path) as f:
+                    state = json.load(f)
+            except Exception:
+                state = None
+
+        if state and state.get('url') == url and state.get('size') == size:
+            logger.info(f"Resuming segmented download of {url}")
+            with self.lock:
+                self.stats['resumed'] += 1
+        else:
+            segment_count = min(self.segments, max(1, size // self.min_segment_bytes))
+            segment_size = -(-size // segment_count)
+            state = {
+                'url': url,
+                'size': size,
+                'segments': [
+                    {'start': start, 'end': min(start + segment_size, size) - 1, 'done': 0}
+                    for start in range(0, size, segment_size)
+                ]
+            }
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+            self._save_state(state, state_path)
+
+        state_lock = threading.Lock()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(state['segments'])) as executor:
+            futures = [
+                executor.submit(self._fetch_segment, url, part_path, state_path, state, segment, state_lock)
+                for segment in state['segments']
+            ]
+            written = sum(future.result() for future in futures)
+
+        return written
+
+    def _fetch_segment(self, url, part_path, state_path, state, segment, state_lock):
+        """Download one byte range, retrying from the last written byte"""
+        buffer = bytearray(self.buffer_size)
+        written = 0
+        attempt = 0
+
+        while True:
+            start = segment['start'] + segment['done']
+            if start > segment['end']:
+                return written
+
+            try:
+                response = self.http.get(url, headers={'Range': f"bytes={start}-{segment['end']}"}, stream=True)
+                if response.status_code != 206:
+                    response.close()
+                    raise IOError(f"Range request not honoured: {response.status_code}")
+
+                with response, open(part_path, 'r+b') as f:
+                    f.seek(start)
+                    remaining = segment['end'] - start + 1
+                    while remaining > 0:
+                        n = self._read_into(response, f, buffer, limit=min(remaining, 8 * self.buffer_size))
+                        if not n:
+                            break
+                        remaining -= n
+                        written += n
+                        f.flush()
+                        with state_lock:
+                            segment['done'] += n
+                            self._save_state(state, state_path)
+
+                if segment['start'] + segment['done'] <= segment['end']:
+                    raise IOError(f"Connection closed early at byte {segment['start'] + segment['done']}")
+            except Exception as e:
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                logger.warning(f"Retrying segment {segment['start']}-{segment['end']} of {url}: {e}")
+
+    def _save_state(self, state, state_path):
+        # Replaced atomically so a crash never leaves unparseable state behind
+        save_json(state, state_path)
@@ -1,6 +1,8 @@
 import os
 import json
 import re
+import hashlib
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,8 +18,11 @@ def load_json(file_path):
 
 def save_json(data, file_path):
     try:
-        with open(file_path, 'w') as f:
+        # Write to a temp file first so readers never see a half-written file
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
             json.dump(data, f, indent=2)
+        os.replace(tmp_path, file_path)
         return True
     except Exception as e:
         print(f"Error saving to {file_path}: {e}")
@@ -29,3 +34,13 @@ def extract_keywords(text, max_keywords=5):
     stopwords = ["the", "and", "is", "in", "to", "a", "for", "of", "with", "that", "this"]
     keywords = [word for word in words if word not in stopwords and len(word) > 3]
     return list(set(keywords))[:max_keywords]
+
+def split_sentences(text):
+    """Split text into sentences on terminal punctuation"""
+    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
+    return [sentence.strip() for sentence in sentences if sentence.strip()]
+
+def cache_key(*parts):
+    """Build a stable hex digest from the given key parts"""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
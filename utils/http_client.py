@@ -0,0 +1,151 @@
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import load_json
+from utils import metrics
+
+# Set up logger
+logger = setup_logger('http_client')
+
+class _ProviderRetry(Retry):
+    """Retry policy that never replays a POST the provider may have acted on.
+
+    POSTs (paid TTS and LLM calls) are only retried when the connection
+    failed before the request was sent, or on a 429/503 that says the
+    request was turned away. Other methods retry on any 429 or 5xx.
+    """
+
+    POST_RETRY_STATUSES = frozenset([429, 503])
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method.upper() == 'POST':
+            return status_code in self.POST_RETRY_STATUSES and super().is_retry('GET', status_code, has_retry_after)
+        return super().is_retry(method, status_code, has_retry_after)
+
+class HTTPClient:
+    """Pooled HTTP session shared by all provider calls.
+
+    Connections are kept alive and reused per host, every request gets a
+    connect/read timeout, and transient failures (connection errors, 429 and
+    5xx) are retried with jittered exponential backoff. At most
+    `pool_maxsize` requests per host wait for a response at once; a request
+    that cannot get a slot within `pool_timeout` seconds fails instead of
+    waiting forever. The slot is returned as soon as the response headers
+    arrive, so long streamed bodies (e.g. download segments) never hold one.
+    """
+
+    def __init__(self, connect_timeout=5, read_timeout=60, retries=3, backoff=0.5, pool_maxsize=10, pool_timeout=30):
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_maxsize = pool_maxsize
+        self.pool_timeout = pool_timeout
+
+        # Connect errors are retried for every method; read errors and the
+        # status list only for the methods allowed here (see _ProviderRetry)
+        retry = _ProviderRetry(
+            total=retries,
+            backoff_factor=backoff,
+            backoff_jitter=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.slots = {}
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the shared session"""
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlparse(url).hostname
+
+        try:
+            slot = self._acquire(host)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            finally:
+                slot.release()
+        except requests.RequestException as e:
+            self._record(host, error=True)
+            metrics.provider_error(host, type(e).__name__)
+            raise
+
+        retries = getattr(getattr(response.raw, 'retries', None), 'history', None) or ()
+        self._record(host, error=response.status_code >= 400, retries=len(retries))
+        # Attempts that were retried count as provider errors too
+        for attempt in retries:
+            metrics.provider_error(host, attempt.status or type(attempt.error).__name__)
+        if response.status_code >= 400:
+            metrics.provider_error(host, response.status_code)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _acquire(self, host):
+        """Take one of the host's request slots, waiting at most pool_timeout"""
+        with self.lock:
+            slot = self.slots.get(host)
+            if slot is None:
+                slot = self.slots[host] = threading.BoundedSemaphore(self.pool_maxsize)
+        if not slot.acquire(timeout=self.pool_timeout):
+            raise requests.exceptions.ConnectionError(
+                f"Timed out after {self.pool_timeout}s waiting for a connection to {host}"
+            )
+        return slot
+
+    def _record(self, host, error=False, retries=0):
+        with self.lock:
+            host_stats = self.stats.setdefault(host, {'requests': 0, 'errors': 0, 'retries': 0})
+            host_stats['requests'] += 1
+            host_stats['errors'] += int(error)
+            host_stats['retries'] += retries
+
+    def get_stats(self):
+        """Per-host request counters plus connection pool usage"""
+        with self.lock:
+            stats = {host: dict(values) for host, values in self.stats.items()}
+
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host_stats = stats.setdefault(pool.host, {'requests': 0, 'errors': 0, 'retries': 0})
+            host_stats['connections_opened'] = host_stats.get('connections_opened', 0) + pool.num_connections
+            host_stats['pool_requests'] = host_stats.get('pool_requests', 0) + pool.num_requests
+        return stats
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client(config_file='config.json'):
+    """Return the process-wide HTTP client, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            config = load_json(config_file).get('http_settings', {})
+            _client = HTTPClient(
+                connect_timeout=config.get('connect_timeout', 5),
+                read_timeout=config.get('read_timeout', 60),
+                retries=config.get('retries', 3),
+                backoff=config.get('backoff', 0.5),
+                pool_maxsize=config.get('pool_maxsize', 10),
+                pool_timeout=config.get('pool_timeout', 30)
+            )
+            logger.info("HTTP client initialized")
+        return _client
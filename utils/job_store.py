@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('job_store')
+
+class JobStore:
+    """SQLite checkpoint store for batch runs.
+
+    Records every idea of a batch together with the last stage it completed
+    (idea, audio, clips, rendered) and the artifact paths produced so far, so
+    an interrupted batch can be resumed without redoing finished work.
+    """
+
+    STAGES = ('idea', 'audio', 'clips', 'rendered')
+
+    def __init__(self, db_path='data/jobs.db'):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS batches (
+                    batch_id TEXT PRIMARY KEY,
+                    created_at REAL,
+                    count INTEGER,
+                    ideas_file TEXT,
+                    status TEXT
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    batch_id TEXT,
+                    idea_id TEXT,
+                    stage TEXT,
+                    idea TEXT,
+                    audio_file TEXT,
+                    video_files TEXT,
+                    video_path TEXT,
+                    error TEXT,
+                    updated_at REAL,
+                    PRIMARY KEY (batch_id, idea_id)
+                )
+            """)
+        logger.info(f"JobStore initialized at {db_path}")
+
+    def create_batch(self, batch_id, ideas, ideas_file=None):
+        """Record a new batch and its ideas"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO batches VALUES (?, ?, ?, ?, ?)",
+                (batch_id, now, len(ideas), ideas_file, 'running')
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (batch_id, idea_id, stage, idea, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(batch_id, str(idea['id']), 'idea', json.dumps(idea), now) for idea in ideas]
+            )
+
+    def get_batch(self, batch_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        return dict(row) if row else None
+
+    def set_batch_status(self, batch_id, status):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE batches SET status = ? WHERE batch_id = ?", (status, batch_id))
+
+    def get_jobs(self, batch_id):
+        """All jobs of a batch with decoded idea and clip lists"""
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM jobs WHERE batch_id = ?", (batch_id,)).fetchall()
+
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job['idea'] = json.loads(job['idea'])
+            job['video_files'] = json.loads(job['video_files']) if job['video_files'] else None
+            jobs.append(job)
+        return jobs
+
+    def checkpoint(self, batch_id, idea_id, stage, **artifacts):
+        """Mark a job as having completed `stage`, storing any new artifact paths.
+
+        A job never moves back to an earlier stage: redoing a stage (e.g.
+        re-fetching evicted clips) only updates its artifacts.
+        """
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+
+        fields = {'stage': stage, 'error': None, 'updated_at': time.time()}
+        for name in ('audio_file', 'video_files', 'video_path'):
+            if name in artifacts:
+                value = artifacts[name]
+                fields[name] = json.dumps(value) if name == 'video_files' else value
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT stage FROM jobs WHERE batch_id = ? AND idea_id = ?", (batch_id, str(idea_id))
+            ).fetchone()
+        if row and row['stage'] in self.STAGES and self.STAGES.index(row['stage']) > self.STAGES.index(stage):
+            del fields['stage']
+
+        self._update(batch_id, idea_id, fields)
+
+    def record_error(self, batch_id, idea_id, error):
+        self._update(batch_id, idea_id, {'error': error, 'updated_at': time.time()})
+
+    def _update(self, batch_id, idea_id, fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.lock, self.conn:
+            self.conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE batch_id = ? AND idea_id = ?",
+                list(fields.values()) + [batch_id, str(idea_id)]
+            )
@@ -0,0 +1,117 @@
+import os
+import re
+import json
+import shutil
+import subprocess
+import functools
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('media')
+
+def ffmpeg_binary():
+    """Locate the ffmpeg executable (env override, PATH, then the one bundled with imageio-ffmpeg)"""
+    binary = os.getenv("FFMPEG_BINARY") or shutil.which('ffmpeg')
+    if binary:
+        return binary
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return 'ffmpeg'
+
+def ffprobe_binary():
+    """Locate ffprobe, or None if it is not installed"""
+    return os.getenv("FFPROBE_BINARY") or shutil.which('ffprobe')
+
+@functools.lru_cache(maxsize=None)
+def has_filter(name, binary=None):
+    """Whether an ffmpeg build (ours by default) includes the filter `name`"""
+    try:
+        result = subprocess.run([binary or ffmpeg_binary(), '-hide_banner', '-filters'], capture_output=True, text=True)
+    except OSError:
+        return False
+    return any(line.split()[1:2] == [name] for line in result.stdout.splitlines())
+
+def escape_filter_value(value):
+    """Escape a value for use inside an ffmpeg filter argument"""
+    return str(value).replace('\\', '\\\\').replace(':', '\\:').replace("'", "\\'")
+
+def caption_scale(width):
+    """Factor for caption sizes, which are tuned for 1080 wide output"""
+    return width / 1080
+
+def parse_resolution(resolution, default=(1080, 1920)):
+    """Parse a "WIDTHxHEIGHT" string"""
+    try:
+        width, height = str(resolution).lower().split('x')
+        return int(width), int(height)
+    except Exception:
+        return default
+
+def _parse_rate(rate):
+    try:
+        num, den = rate.split('/')
+        return float(num) / float(den) if float(den) else 0.0
+    except Exception:
+        return float(rate or 0)
+
+def probe(path):
+    """Read duration, resolution, fps and codec of a media file without decoding it"""
+    ffprobe = ffprobe_binary()
+    if ffprobe:
+        result = subprocess.run(
+            [ffprobe, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ffprobe failed for {path}: {result.stderr.strip()}")
+
+        data = json.loads(result.stdout)
+        info = {'duration': float(data.get('format', {}).get('duration', 0) or 0)}
+        for stream in data.get('streams', []):
+            if stream.get('codec_type') == 'video' and 'width' not in info:
+                info.update({
+                    'width': stream.get('width'),
+                    'height': stream.get('height'),
+                    'fps': _parse_rate(stream.get('avg_frame_rate') or stream.get('r_frame_rate')),
+                    'codec': stream.get('codec_name')
+                })
+            elif stream.get('codec_type') == 'audio' and 'audio_codec' not in info:
+                info['audio_codec'] = stream.get('codec_name')
+        return info
+
+    # No ffprobe: parse the stream summary ffmpeg prints for `-i`
+    result = subprocess.run([ffmpeg_binary(), '-hide_banner', '-i', path], capture_output=True, text=True)
+    output = result.stderr
+    info = {}
+
+    match = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', output)
+    if not match:
+        raise RuntimeError(f"Could not probe {path}")
+    hours, minutes, seconds = match.groups()
+    info['duration'] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    match = re.search(r'Stream #.*?Video: (\w+).*?, (\d{2,5})x(\d{2,5})', output)
+    if match:
+        info['codec'] = match.group(1)
+        info['width'] = int(match.group(2))
+        info['height'] = int(match.group(3))
+        fps = re.search(r'([\d.]+) fps', output)
+        info['fps'] = float(fps.group(1)) if fps else 0.0
+
+    match = re.search(r'Stream #.*?Audio: (\w+)', output)
+    if match:
+        info['audio_codec'] = match.group(1)
+    return info
+
+def run_ffmpeg(args):
+    """Run ffmpeg with the given arguments, raising on failure"""
+    cmd = [ffmpeg_binary(), '-hide_banner', '-y'] + args
+    logger.info(f"Running ffmpeg: {' '.join(cmd)}")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {result.returncode}: {result.stderr.strip()[-2000:]}")
+    return result
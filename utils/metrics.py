@@ -0,0 +1,96 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram,
+    generate_latest, push_to_gateway, write_to_textfile
+)
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('metrics')
+
+# Seconds; covers cached lookups up to long renders
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    'tiktok_stage_seconds', 'Time spent in a pipeline stage',
+    ['stage'], buckets=STAGE_BUCKETS
+)
+STAGE_FAILURES = Counter(
+    'tiktok_stage_failures_total', 'Pipeline stage calls that raised or returned no result',
+    ['stage']
+)
+DOWNLOAD_BYTES = Counter(
+    'tiktok_download_bytes_total', 'Bytes of stock footage downloaded'
+)
+RENDER_FPS = Gauge(
+    'tiktok_render_fps', 'Output frames encoded per second of wall time in the last render',
+    ['engine']
+)
+RENDER_FRAMES = Counter(
+    'tiktok_render_frames_total', 'Output frames encoded',
+    ['engine']
+)
+PROVIDER_ERRORS = Counter(
+    'tiktok_provider_errors_total', 'Failed provider API calls',
+    ['provider', 'status']
+)
+CACHE_REQUESTS = Counter(
+    'tiktok_cache_requests_total', 'Cache lookups; hit ratio = hit / (hit + miss)',
+    ['cache', 'result']
+)
+QUEUE_DEPTH = Gauge(
+    'tiktok_queue_depth', 'Items waiting in front of a stage or worker pool',
+    ['queue']
+)
+
+@contextmanager
+def stage_timer(stage):
+    """Time a block into the stage histogram; an exception also counts as a failure"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_FAILURES.labels(stage=stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+
+def stage_failed(stage):
+    STAGE_FAILURES.labels(stage=stage).inc()
+
+def cache_lookup(cache, hit):
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+def provider_error(provider, status):
+    PROVIDER_ERRORS.labels(provider=provider or 'unknown', status=str(status)).inc()
+
+def record_render(engine, frames, seconds):
+    """Record an encode of `frames` output frames that took `seconds`"""
+    RENDER_FRAMES.labels(engine=engine).inc(frames)
+    if seconds > 0:
+        RENDER_FPS.labels(engine=engine).set(frames / seconds)
+
+def set_queue_depth(name, depth):
+    QUEUE_DEPTH.labels(queue=name).set(depth)
+
+def latest():
+    """Current metrics in the Prometheus text format, with its content type"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+def export(textfile=None, pushgateway=None, job='tiktok_batch'):
+    """Write the metrics to a node-exporter textfile and/or push them to a Pushgateway"""
+    if textfile:
+        try:
+            write_to_textfile(textfile, REGISTRY)
+            logger.info(f"Metrics written to {textfile}")
+        except Exception as e:
+            logger.error(f"Error writing metrics to {textfile}: {e}")
+    if pushgateway:
+        try:
+            push_to_gateway(pushgateway, job=job, registry=REGISTRY)
+            logger.info(f"Metrics pushed to {pushgateway}")
+        except Exception as e:
+            logger.error(f"Error pushing metrics to {pushgateway}: {e}")
@@ -0,0 +1,103 @@
+import queue
+import threading
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils import metrics
+
+# Set up logger
+logger = setup_logger('pipeline')
+
+# Marks the end of a stage's input
+_STOP = object()
+
+class Stage:
+    """A pipeline step: `func` maps an item to the next item, or None on failure"""
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+class StagedPipeline:
+    """Run items through a chain of stages.
+
+    Each stage has its own worker threads and a bounded input queue, so a
+    slow stage applies backpressure instead of letting work pile up, and
+    different items can be in different stages at the same time.
+    """
+
+    def __init__(self, stages, queue_size=4):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.queues = []
+
+    def queue_depths(self):
+        """Current number of items waiting in front of each stage"""
+        return {stage.name: q.qsize() for stage, q in zip(self.stages, self.queues)}
+
+    def _report_depths(self):
+        for name, depth in self.queue_depths().items():
+            metrics.set_queue_depth(name, depth)
+
+    def run(self, items):
+        """Process all items and return the outputs of the last stage"""
+        self.queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = queue.Queue()
+        outputs = self.queues[1:] + [results]
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            remaining = {'workers': stage.workers}
+            lock = threading.Lock()
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(stage, self.queues[index], outputs[index], remaining, lock, index + 1 < len(self.stages)),
+                    name=f"{stage.name}-{n + 1}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        # Feed the first stage; blocks while it is saturated
+        for item in items:
+            self.queues[0].put(item)
+            self._report_depths()
+        for _ in range(self.stages[0].workers):
+            self.queues[0].put(_STOP)
+
+        for thread in threads:
+            thread.join()
+        self._report_depths()
+
+        outputs = []
+        while not results.empty():
+            outputs.append(results.get())
+        return outputs
+
+    def _worker(self, stage, in_queue, out_queue, remaining, lock, has_next):
+        while True:
+            item = in_queue.get()
+            if item is _STOP:
+                break
+            self._report_depths()
+
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                logger.error(f"Error in pipeline stage {stage.name}: {e}")
+                result = None
+
+            if result is not None:
+                out_queue.put(result)
+                self._report_depths()
+
+        # The last worker of a stage shuts down the next one
+        with lock:
+            remaining['workers'] -= 1
+            last = remaining['workers'] == 0
+        if last and has_next:
+            next_stage = self.stages[self.stages.index(stage) + 1]
+            for _ in range(next_stage.workers):
+                out_queue.put(_STOP)
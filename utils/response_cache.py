@@ -0,0 +1,67 @@
+import os
+import time
+import random
+import threading
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import load_json, save_json, cache_key
+
+# Set up logger
+logger = setup_logger('response_cache')
+
+class ResponseCache:
+    """On-disk prompt -> response cache holding up to `variants` responses per prompt.
+
+    Until a prompt has collected `variants` fresh responses, lookups miss so
+    callers keep asking the model for new ones; after that a random stored
+    variant is returned. Responses older than `ttl` seconds are dropped.
+    """
+
+    def __init__(self, cache_file='assets/cache/llm_responses.json', variants=3, ttl=604800):
+        self.cache_file = cache_file
+        self.variants = max(1, variants)
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.entries = load_json(cache_file) if os.path.exists(cache_file) else {}
+        self.stats = {'hits': 0, 'misses': 0}
+        logger.info(f"ResponseCache initialized with {len(self.entries)} prompts")
+
+    def key(self, model, prompt, **params):
+        return cache_key(model, prompt, params)
+
+    def get(self, key):
+        """Return a cached response, or None when more variants are wanted"""
+        with self.lock:
+            fresh = self._fresh_variants(key)
+            if len(fresh) >= self.variants:
+                self.stats['hits'] += 1
+                return random.choice(fresh)['content']
+
+            self.stats['misses'] += 1
+            return None
+
+    def add(self, key, content):
+        """Store a new response variant for a prompt"""
+        with self.lock:
+            fresh = self._fresh_variants(key)
+            fresh.append({'content': content, 'created_at': time.time()})
+            self.entries[key] = fresh[-self.variants:]
+            save_json(self.entries, self.cache_file)
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['prompts'] = len(self.entries)
+            return stats
+
+    def _fresh_variants(self, key):
+        now = time.time()
+        variants = [v for v in self.entries.get(key, []) if now - v['created_at'] < self.ttl]
+        if variants:
+            self.entries[key] = variants
+        else:
+            self.entries.pop(key, None)
+        return variants
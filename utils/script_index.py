@@ -0,0 +1,179 @@
+import os
+import re
+import time
+import random
+import hashlib
+import threading
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+from utils.helpers import load_json, save_json, cache_key
+
+# Set up logger
+logger = setup_logger('script_index')
+
+# Mersenne prime for the MinHash permutations
+_PRIME = (1 << 61) - 1
+
+def _shingles(text, size=3):
+    """Word n-grams of the normalized text"""
+    words = re.sub(r'[^\w\s]', ' ', text.lower()).split()
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def script_text(script):
+    return ' '.join(script.get(key) or '' for key in ('hook', 'body', 'cta'))
+
+def candidate_probability(similarity, bands, rows):
+    """Chance that two scripts with this Jaccard similarity share an LSH band"""
+    return 1 - (1 - similarity ** rows) ** bands
+
+def choose_bands(num_perm, threshold, recall=0.99):
+    """Fewest bands that make a pair at `threshold` a candidate with probability `recall`.
+
+    Fewer, longer bands mean fewer false candidates, so the longest band
+    that still reaches the recall wins.
+    """
+    for rows in range(num_perm, 0, -1):
+        if num_perm % rows == 0 and candidate_probability(threshold, num_perm // rows, rows) >= recall:
+            return num_perm // rows
+    return num_perm
+
+class ScriptIndex:
+    """MinHash/LSH index of generated scripts for near-duplicate detection.
+
+    Each script is reduced to `num_perm` MinHash values over its word
+    shingles. The signature is split into `bands`, by default as few as
+    still make a pair at `threshold` a candidate 99% of the time; scripts
+    sharing any band are candidates, and a candidate whose estimated Jaccard similarity
+    reaches `threshold` is a near-duplicate. Scripts are recorded once a
+    video has been produced from them; entries persist in a JSON file and
+    are forgotten after `history_days`, so repeats are caught across batches
+    without the index growing forever.
+    """
+
+    def __init__(self, index_file='assets/cache/script_index.json', num_perm=64, bands=None,
+                 threshold=0.5, shingle_size=3, history_days=30):
+        bands = bands or choose_bands(num_perm, threshold)
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.index_file = index_file
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.history_seconds = history_days * 86400
+        os.makedirs(os.path.dirname(index_file) or '.', exist_ok=True)
+
+        # Fixed seed so signatures stay comparable across runs
+        rng = random.Random(1)
+        self.permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+        self.lock = threading.Lock()
+        index = load_json(index_file) if os.path.exists(index_file) else {}
+        entries = index.get('entries', {})
+        if index.get('num_perm') != num_perm:
+            # Signatures from another configuration cannot be compared
+            entries = {}
+        self.entries = {}
+        self.buckets = {}
+        for entry_id, entry in entries.items():
+            self._insert(entry_id, entry)
+        self._expire()
+
+        self.stats = {'checked': 0, 'duplicates': 0}
+        logger.info(f"ScriptIndex initialized with {len(self.entries)} scripts")
+
+    def signature(self, script):
+        """MinHash signature of a script"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+            for shingle in _shingles(script_text(script), self.shingle_size)
+        ]
+        if not hashes:
+            return [_PRIME] * self.num_perm
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in self.permutations]
+
+    def _bands(self, signature):
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            yield f"{band}:{cache_key(rows)[:16]}"
+
+    def _insert(self, entry_id, entry):
+        self.entries[entry_id] = entry
+        for band in self._bands(entry['signature']):
+            self.buckets.setdefault(band, set()).add(entry_id)
+
+    def _remove(self, entry_id):
+        entry = self.entries.pop(entry_id)
+        for band in self._bands(entry['signature']):
+            ids = self.buckets.get(band)
+            if ids:
+                ids.discard(entry_id)
+                if not ids:
+                    del self.buckets[band]
+
+    def _expire(self):
+        """Forget scripts older than the history window"""
+        cutoff = time.time() - self.history_seconds
+        for entry_id in [entry_id for entry_id, entry in self.entries.items() if entry['added_at'] < cutoff]:
+            self._remove(entry_id)
+
+    def _find(self, signature, batch=None):
+        self.stats['checked'] += 1
+        candidates = set()
+        for band in self._bands(signature):
+            candidates |= self.buckets.get(band, set())
+
+        # Unrecorded scripts of the current run are few, so compare them all
+        entries = [(entry_id, self.entries[entry_id]) for entry_id in candidates]
+        entries.extend((batch or {}).items())
+
+        best = None
+        for entry_id, entry in entries:
+            similarity = sum(1 for x, y in zip(signature, entry['signature']) if x == y) / self.num_perm
+            if similarity >= self.threshold and (not best or similarity > best[2]):
+                best = (entry_id, entry, similarity)
+        if best:
+            self.stats['duplicates'] += 1
+        return best
+
+    def entry(self, script, title=None):
+        """(entry_id, entry) of a script, as match() and record() use them"""
+        entry_id = cache_key(script_text(script))[:16]
+        return entry_id, {'signature': self.signature(script), 'title': title, 'added_at': time.time()}
+
+    def find(self, script, batch=None):
+        """Most similar script as (entry_id, entry, similarity), or None below the threshold.
+
+        `batch` maps entry ids to entries not recorded yet, such as the
+        earlier scripts of the same run, which are checked as well.
+        """
+        return self.match(self.signature(script), batch)
+
+    def match(self, signature, batch=None):
+        """find() for a precomputed signature"""
+        with self.lock:
+            return self._find(signature, batch)
+
+    def record(self, script, title=None):
+        """Index a script a video was produced from and persist the index"""
+        entry_id, entry = self.entry(script, title)
+        with self.lock:
+            if entry_id in self.entries:
+                self._remove(entry_id)
+            self._insert(entry_id, entry)
+            self._expire()
+            self._save()
+        return entry_id
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['scripts'] = len(self.entries)
+            return stats
+
+    def _save(self):
+        save_json({'num_perm': self.num_perm, 'entries': self.entries}, self.index_file)
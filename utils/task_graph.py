@@ -0,0 +1,65 @@
+import concurrent.futures
+import sys
+sys.path.append('..')
+from utils.logger import setup_logger
+
+# Set up logger
+logger = setup_logger('task_graph')
+
+class TaskGraph:
+    """Run named tasks concurrently as soon as their dependencies are done.
+
+    Each task function receives a dict with the results of its
+    dependencies. A task that raises or returns a falsy result counts as
+    failed, and every task depending on it is skipped.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+
+    def add(self, name, func, deps=()):
+        for dep in deps:
+            if dep not in self.tasks:
+                raise ValueError(f"Unknown dependency {dep} for task {name}")
+        self.tasks[name] = (func, tuple(deps))
+        return self
+
+    def run(self, max_workers=None):
+        """Run all tasks; returns (results, errors) keyed by task name"""
+        results = {}
+        errors = {}
+        pending = dict(self.tasks)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or len(self.tasks) or 1) as executor:
+            running = {}
+
+            while pending or running:
+                # Start every task whose dependencies have succeeded; skip those whose dependencies failed
+                for name, (func, deps) in list(pending.items()):
+                    if any(dep in errors for dep in deps):
+                        errors[name] = "skipped: dependency failed"
+                        del pending[name]
+                    elif all(dep in results for dep in deps):
+                        inputs = {dep: results[dep] for dep in deps}
+                        running[executor.submit(func, inputs)] = name
+                        del pending[name]
+
+                if not running:
+                    break
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Task {name} failed: {e}")
+                        errors[name] = str(e)
+                        continue
+
+                    if result:
+                        results[name] = result
+                    else:
+                        errors[name] = "no result"
+
+        return results, errors